@@ -1,6 +1,7 @@
 """The Waveshare Relay integration."""
 from __future__ import annotations
 
+import asyncio
 import logging
 from typing import Any
 
@@ -8,157 +9,152 @@ import voluptuous as vol
 
 from homeassistant.const import CONF_HOST, CONF_PORT
 from homeassistant.core import HomeAssistant
-import homeassistant.helpers.config_validation as cv
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.helpers.discovery import async_load_platform
 
 from .const import (
     DOMAIN,
+    DATA_PENDING_HUBS,
     CONF_NAME,
-    CONF_DEVICE_ADDRESS,
-    CONF_TIMEOUT,
-    CONF_LIGHTS,
-    CONF_SWITCHES,
-    CONF_ADDRESS,
     CONF_RESTORE_STATE,
-    DEFAULT_PORT,
-    DEFAULT_DEVICE_ADDRESS,
-    DEFAULT_TIMEOUT,
+    CONF_POLL_INTERVAL,
     DEFAULT_RESTORE_STATE,
+    DEFAULT_POLL_INTERVAL,
 )
+from .schemas import CONFIG_SCHEMA, DOMAIN_CONFIG_SCHEMA, RELAY_MODULE_SCHEMA  # noqa: F401
 from .hub import WaveshareRelayHub
 from .coordinator import WaveshareRelayCoordinator
+from .models import RuntimeData
 
 _LOGGER = logging.getLogger(__name__)
-_LOGGER.setLevel(logging.DEBUG)
-
-# YAML configuration schema for a single relay module
-RELAY_MODULE_SCHEMA = vol.Schema(
-    {
-        vol.Required(CONF_HOST): cv.string,
-        vol.Required(CONF_NAME): cv.string,
-        vol.Optional(CONF_PORT, default=DEFAULT_PORT): cv.port,
-        vol.Optional(CONF_DEVICE_ADDRESS, default=DEFAULT_DEVICE_ADDRESS): cv.positive_int,
-        vol.Optional(CONF_TIMEOUT, default=DEFAULT_TIMEOUT): cv.positive_int,
-        vol.Optional("num_relays", default=32): vol.All(cv.positive_int, vol.Range(min=1, max=32)),
-        vol.Optional(CONF_RESTORE_STATE, default=DEFAULT_RESTORE_STATE): cv.boolean,
-        vol.Optional(CONF_LIGHTS, default=[]): [
-            vol.Schema(
-                {
-                    vol.Required(CONF_NAME): cv.string,
-                    vol.Required(CONF_ADDRESS): vol.All(cv.positive_int, vol.Range(min=1, max=32)),
-                }
-            )
-        ],
-        vol.Optional(CONF_SWITCHES, default=[]): [
-            vol.Schema(
-                {
-                    vol.Required(CONF_NAME): cv.string,
-                    vol.Required(CONF_ADDRESS): vol.All(cv.positive_int, vol.Range(min=1, max=32)),
-                }
-            )
-        ],
-    }
-)
 
-# YAML configuration schema for the entire integration
-CONFIG_SCHEMA = vol.Schema(
-    {
-        DOMAIN: vol.All(
-            cv.ensure_list,
-            [RELAY_MODULE_SCHEMA]
-        )
-    },
-    extra=vol.ALLOW_EXTRA  # Allow other configuration sections
-)
+# Hubs kept across config entry setup retries, keyed by (host, port), so a
+# retry reuses the existing hub instead of reconnecting from scratch
+_HUB_CACHE: dict[tuple[str, int], WaveshareRelayHub] = {}
+
+# Per-entry locks so concurrent setups of one entry share a single hub
+_SETUP_LOCKS: dict[str, asyncio.Lock] = {}
 
 async def async_setup(hass: HomeAssistant, config: dict[str, Any]) -> bool:
     """Set up the Waveshare Relay component from YAML."""
+    # Runs before any config entry is set up, so entries can skip setdefault
+    hass.data[DOMAIN] = {}
+
     if DOMAIN not in config:
         return True
 
     try:
         # Validate only our section
-        config[DOMAIN] = CONFIG_SCHEMA(config)[DOMAIN]
+        config[DOMAIN] = DOMAIN_CONFIG_SCHEMA(config[DOMAIN])
     except vol.Invalid as err:
         _LOGGER.error("Invalid configuration: %s", err)
         return False
 
-    # Set up each relay hub from YAML
-    hass.data.setdefault(DOMAIN, {})
-    for entry_config in config[DOMAIN]:
+    async def _setup_one(entry_config: dict[str, Any]) -> None:
+        """Set up a single relay hub from YAML."""
         _LOGGER.debug("Setting up Waveshare Relay hub: %s", entry_config[CONF_NAME])
-        hub = await WaveshareRelayHub.create(entry_config, hass)
-        entry_id = f"{entry_config[CONF_HOST]}_{entry_config[CONF_NAME]}"
-        hass.data[DOMAIN][entry_id] = hub
+        try:
+            hub = await WaveshareRelayHub.create(entry_config, hass)
+
+            # Restore last states if enabled
+            if entry_config.get(CONF_RESTORE_STATE, DEFAULT_RESTORE_STATE):
+                await hub.restore_last_states()
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception("Failed to set up Waveshare Relay hub %s", entry_config[CONF_NAME])
+            return
+
+        # Entities read their state from the coordinator, which polls the hub once
+        coordinator = WaveshareRelayCoordinator(
+            hass,
+            hub,
+            poll_interval=entry_config.get(CONF_POLL_INTERVAL, DEFAULT_POLL_INTERVAL),
+        )
+        await coordinator.async_refresh()
 
-        # Restore last states if enabled
-        if entry_config.get(CONF_RESTORE_STATE, DEFAULT_RESTORE_STATE):
-            await hub.restore_last_states()
+        entry_id = f"{entry_config[CONF_HOST]}_{entry_config[CONF_NAME]}"
+        hass.data[DOMAIN][entry_id] = RuntimeData(hub=hub, coordinator=coordinator)
 
         # Load platforms for this hub
-        _LOGGER.debug("Loading light platform for hub: %s", entry_config[CONF_NAME])
-        _LOGGER.debug("Light platform config: %s", {"entry_id": entry_id, "config": entry_config})
-        hass.async_create_task(
-            async_load_platform(
-                hass,
-                "light",
-                DOMAIN,
-                {"entry_id": entry_id, "config": entry_config},
-                config,
+        platform_config = {"entry_id": entry_id, "config": entry_config}
+        for platform in ("light", "switch"):
+            _LOGGER.debug(
+                "Loading %s platform for hub %s entry_id=%s",
+                platform,
+                entry_config[CONF_NAME],
+                entry_id,
             )
-        )
-        _LOGGER.debug("Loading switch platform for hub: %s", entry_config[CONF_NAME])
-        _LOGGER.debug("Switch platform config: %s", {"entry_id": entry_id, "config": entry_config})
-        hass.async_create_task(
-            async_load_platform(
-                hass,
-                "switch",
-                DOMAIN,
-                {"entry_id": entry_id, "config": entry_config},
-                config,
+            hass.async_create_task(
+                async_load_platform(hass, platform, DOMAIN, platform_config, config),
+                eager_start=True,
             )
-        )
+
+    # Set up all relay hubs from YAML concurrently
+    await asyncio.gather(*(_setup_one(entry_config) for entry_config in config[DOMAIN]))
 
     return True
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Waveshare Relay from a config entry."""
-    hub = await WaveshareRelayHub.create(entry.data, hass)
-    
-    # Create coordinator for this hub
-    coordinator = WaveshareRelayCoordinator(
-        hass, 
-        hub, 
-        poll_interval=entry.data.get("poll_interval", 30)
-    )
-    
-    # Perform initial data fetch
-    await coordinator.async_config_entry_first_refresh()
-    
-    hass.data.setdefault(DOMAIN, {})
-    hass.data[DOMAIN][entry.entry_id] = {
-        "hub": hub,
-        "coordinator": coordinator,
-    }
-
-    # Restore last states if enabled
-    if entry.data.get(CONF_RESTORE_STATE, DEFAULT_RESTORE_STATE):
-        await hub.restore_last_states()
-
-    # Forward the setup to the platforms
-    await hass.config_entries.async_forward_entry_setups(entry, ["light", "switch"])
+    async with _SETUP_LOCKS.setdefault(entry.entry_id, asyncio.Lock()):
+        hub_key = (entry.data[CONF_HOST], entry.data[CONF_PORT])
+        # The hub the config flow just connected with, if any
+        pending_hub = hass.data.get(DATA_PENDING_HUBS, {}).pop(hub_key, None)
+        hub = _HUB_CACHE.get(hub_key)
+        if hub is None:
+            hub = pending_hub
+            if hub is None:
+                hub = await WaveshareRelayHub.create(entry.data, hass)
+            _HUB_CACHE[hub_key] = hub
+        elif pending_hub is not None and pending_hub is not hub:
+            # A hub from an earlier attempt is reused; release the probe's
+            await pending_hub.close()
+
+        # Create coordinator for this hub
+        coordinator = WaveshareRelayCoordinator(
+            hass, 
+            hub, 
+            poll_interval=entry.data.get(CONF_POLL_INTERVAL, DEFAULT_POLL_INTERVAL)
+        )
 
-    return True
+        hass.data[DOMAIN][entry.entry_id] = RuntimeData(hub=hub, coordinator=coordinator)
+
+        # Restore last states if enabled, before the initial fetch so the
+        # coordinator starts out with the states the device ends up in
+        if entry.data.get(CONF_RESTORE_STATE, DEFAULT_RESTORE_STATE):
+            await hub.restore_last_states()
+
+        # Perform initial data fetch
+        await coordinator.async_config_entry_first_refresh()
+
+        # Forward the setup to the platforms
+        await hass.config_entries.async_forward_entry_setups(entry, ["light", "switch"])
+
+        return True
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, ["light", "switch"])
     if unload_ok:
-        entry_data = hass.data[DOMAIN].pop(entry.entry_id)
-        # Clean up coordinator if it exists
-        if "coordinator" in entry_data:
-            coordinator = entry_data["coordinator"]
-            # The coordinator will be automatically cleaned up when the entry is removed
-
-    return unload_ok
\ No newline at end of file
+        # Tolerate a repeated unload of the same entry
+        hass.data[DOMAIN].pop(entry.entry_id, None)
+        _SETUP_LOCKS.pop(entry.entry_id, None)
+        # The coordinator will be automatically cleaned up when the entry is removed
+        hub = _HUB_CACHE.pop((entry.data[CONF_HOST], entry.data[CONF_PORT]), None)
+        if hub is not None:
+            await hub.close()
+
+    return unload_ok
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Release the hub of a removed entry, even if setup never completed."""
+    hass.data.get(DOMAIN, {}).pop(entry.entry_id, None)
+    _SETUP_LOCKS.pop(entry.entry_id, None)
+    hub_key = (entry.data[CONF_HOST], entry.data[CONF_PORT])
+    # An entry stuck retrying setup is removed without being unloaded, and
+    # one removed before its first setup may still have a probe hub waiting
+    for hub in (
+        _HUB_CACHE.pop(hub_key, None),
+        hass.data.get(DATA_PENDING_HUBS, {}).pop(hub_key, None),
+    ):
+        if hub is not None:
+            await hub.close()
@@ -2,6 +2,8 @@
 from __future__ import annotations
 
 import logging
+import sys
+from functools import lru_cache
 from typing import Any, Dict, Optional
 
 import voluptuous as vol
@@ -14,45 +16,62 @@ import homeassistant.helpers.config_validation as cv
 
 from .const import (
     DOMAIN,
+    DATA_PENDING_HUBS,
     CONF_DEVICE_ADDRESS,
     CONF_TIMEOUT,
     CONF_RESTORE_STATE,
     CONF_POLL_INTERVAL,
     CONF_MAX_RETRIES,
+    CONF_BATCH_MS,
     DEFAULT_PORT,
     DEFAULT_DEVICE_ADDRESS,
     DEFAULT_TIMEOUT,
     DEFAULT_RESTORE_STATE,
     DEFAULT_POLL_INTERVAL,
     DEFAULT_MAX_RETRIES,
+    DEFAULT_BATCH_MS,
 )
 from .hub import WaveshareRelayHub
+from .schemas import BATCH_MS_VALIDATOR, DEVICE_ADDR_VALIDATOR, NUM_RELAYS_VALIDATOR
 
 _LOGGER = logging.getLogger(__name__)
 
+# Validators shared by the user and options schemas
+_TIMEOUT_VALIDATOR = vol.All(cv.positive_int, vol.Range(min=1, max=60))
+_POLL_INTERVAL_VALIDATOR = vol.All(cv.positive_int, vol.Range(min=5, max=300))
+_MAX_RETRIES_VALIDATOR = vol.All(cv.positive_int, vol.Range(min=1, max=10))
+
 STEP_USER_DATA_SCHEMA = vol.Schema(
     {
         vol.Required(CONF_HOST): cv.string,
         vol.Required(CONF_NAME): cv.string,
         vol.Optional(CONF_PORT, default=DEFAULT_PORT): cv.port,
-        vol.Optional(CONF_DEVICE_ADDRESS, default=DEFAULT_DEVICE_ADDRESS): vol.All(
-            cv.positive_int, vol.Range(min=1, max=255)
-        ),
-        vol.Optional("num_relays", default=32): vol.In([8, 16, 32]),
-        vol.Optional(CONF_TIMEOUT, default=DEFAULT_TIMEOUT): vol.All(
-            cv.positive_int, vol.Range(min=1, max=60)
-        ),
-        vol.Optional(CONF_POLL_INTERVAL, default=DEFAULT_POLL_INTERVAL): vol.All(
-            cv.positive_int, vol.Range(min=5, max=300)
-        ),
-        vol.Optional(CONF_MAX_RETRIES, default=DEFAULT_MAX_RETRIES): vol.All(
-            cv.positive_int, vol.Range(min=1, max=10)
-        ),
+        vol.Optional(CONF_DEVICE_ADDRESS, default=DEFAULT_DEVICE_ADDRESS): DEVICE_ADDR_VALIDATOR,
+        vol.Optional("num_relays", default=32): NUM_RELAYS_VALIDATOR,
+        vol.Optional(CONF_TIMEOUT, default=DEFAULT_TIMEOUT): _TIMEOUT_VALIDATOR,
+        vol.Optional(CONF_POLL_INTERVAL, default=DEFAULT_POLL_INTERVAL): _POLL_INTERVAL_VALIDATOR,
+        vol.Optional(CONF_MAX_RETRIES, default=DEFAULT_MAX_RETRIES): _MAX_RETRIES_VALIDATOR,
+        vol.Optional(CONF_BATCH_MS, default=DEFAULT_BATCH_MS): BATCH_MS_VALIDATOR,
         vol.Optional(CONF_RESTORE_STATE, default=DEFAULT_RESTORE_STATE): cv.boolean,
     }
 )
 
 
+@lru_cache(maxsize=32)
+def _options_schema(
+    poll_interval: int, max_retries: int, timeout: int, restore_state: bool
+) -> vol.Schema:
+    """Return the options schema with the given defaults, built once per set of defaults."""
+    return vol.Schema(
+        {
+            vol.Optional(CONF_POLL_INTERVAL, default=poll_interval): _POLL_INTERVAL_VALIDATOR,
+            vol.Optional(CONF_MAX_RETRIES, default=max_retries): _MAX_RETRIES_VALIDATOR,
+            vol.Optional(CONF_TIMEOUT, default=timeout): _TIMEOUT_VALIDATOR,
+            vol.Optional(CONF_RESTORE_STATE, default=restore_state): cv.boolean,
+        }
+    )
+
+
 async def validate_input(hass: HomeAssistant, data: Dict[str, Any]) -> Dict[str, Any]:
     """Validate the user input allows us to connect.
 
@@ -63,12 +82,19 @@ async def validate_input(hass: HomeAssistant, data: Dict[str, Any]) -> Dict[str,
         data["num_relays"] = int(data["num_relays"])
 
     # Test connection to the hub
+    hub = WaveshareRelayHub(data, hass)
     try:
-        hub = WaveshareRelayHub(data)
-        await hub.read_relay_status()
+        states = await hub.read_relay_status()
     except Exception as exc:
         _LOGGER.error("Failed to connect to hub: %s", exc)
+        await hub.close()
         raise CannotConnect from exc
+    if states is None:
+        await hub.close()
+        raise CannotConnect
+
+    # Hand the connected hub over to async_setup_entry so it is not rebuilt
+    hass.data.setdefault(DATA_PENDING_HUBS, {})[(data[CONF_HOST], data[CONF_PORT])] = hub
 
     # Return info that you want to store in the config entry.
     return {
@@ -78,6 +104,20 @@ async def validate_input(hass: HomeAssistant, data: Dict[str, Any]) -> Dict[str,
     }
 
 
+def _error_key(err: Exception) -> str:
+    """Return the translation key for an error raised while validating input."""
+    key = _ERROR_MAP.get(type(err))
+    if key is None:
+        _LOGGER.exception("Unexpected exception")
+        return "unknown"
+    return key
+
+
+def _unique_id(host: str, port: int) -> str:
+    """Return the unique ID for a hub at host:port."""
+    return sys.intern(f"{host}_{port}")
+
+
 class ConfigFlow(config_entries.ConfigFlow):
     """Handle a config flow for Waveshare Relay Hub."""
 
@@ -106,20 +146,17 @@ class ConfigFlow(config_entries.ConfigFlow):
 
         errors = {}
 
+        # Check if already configured before probing the device
+        host = user_input[CONF_HOST]
+        port = user_input[CONF_PORT]
+        await self.async_set_unique_id(_unique_id(host, port))
+        self._abort_if_unique_id_configured()
+
         try:
             info = await validate_input(self.hass, user_input)
-        except CannotConnect:
-            errors["base"] = "cannot_connect"
-        except InvalidAuth:
-            errors["base"] = "invalid_auth"
-        except Exception:  # pylint: disable=broad-except
-            _LOGGER.exception("Unexpected exception")
-            errors["base"] = "unknown"
+        except Exception as err:  # pylint: disable=broad-except
+            errors["base"] = _error_key(err)
         else:
-            # Check if already configured
-            await self.async_set_unique_id(f"{user_input[CONF_HOST]}_{user_input[CONF_PORT]}")
-            self._abort_if_unique_id_configured()
-
             return self.async_create_entry(title=info["title"], data=user_input)
 
         return self.async_show_form(
@@ -147,13 +184,8 @@ class ConfigFlow(config_entries.ConfigFlow):
 
         try:
             await validate_input(self.hass, user_input)
-        except CannotConnect:
-            errors["base"] = "cannot_connect"
-        except InvalidAuth:
-            errors["base"] = "invalid_auth"
-        except Exception:  # pylint: disable=broad-except
-            _LOGGER.exception("Unexpected exception")
-            errors["base"] = "unknown"
+        except Exception as err:  # pylint: disable=broad-except
+            errors["base"] = _error_key(err)
         else:
             if self._reauth_entry:
                 self.hass.config_entries.async_update_entry(
@@ -161,6 +193,12 @@ class ConfigFlow(config_entries.ConfigFlow):
                 )
                 await self.hass.config_entries.async_reload(self._reauth_entry.entry_id)
                 return self.async_abort(reason="reauth_successful")
+            # No entry will pick up the hub validate_input connected with
+            hub = self.hass.data.get(DATA_PENDING_HUBS, {}).pop(
+                (user_input[CONF_HOST], user_input[CONF_PORT]), None
+            )
+            if hub is not None:
+                await hub.close()
 
         return self.async_show_form(
             step_id="reauth_confirm",
@@ -181,27 +219,14 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         if user_input is not None:
             return self.async_create_entry(title="", data=user_input)
 
+        data = self.config_entry.data
         return self.async_show_form(
             step_id="init",
-            data_schema=vol.Schema(
-                {
-                    vol.Optional(
-                        CONF_POLL_INTERVAL,
-                        default=self.config_entry.data.get(CONF_POLL_INTERVAL, DEFAULT_POLL_INTERVAL),
-                    ): vol.All(cv.positive_int, vol.Range(min=5, max=300)),
-                    vol.Optional(
-                        CONF_MAX_RETRIES,
-                        default=self.config_entry.data.get(CONF_MAX_RETRIES, DEFAULT_MAX_RETRIES),
-                    ): vol.All(cv.positive_int, vol.Range(min=1, max=10)),
-                    vol.Optional(
-                        CONF_TIMEOUT,
-                        default=self.config_entry.data.get(CONF_TIMEOUT, DEFAULT_TIMEOUT),
-                    ): vol.All(cv.positive_int, vol.Range(min=1, max=60)),
-                    vol.Optional(
-                        CONF_RESTORE_STATE,
-                        default=self.config_entry.data.get(CONF_RESTORE_STATE, DEFAULT_RESTORE_STATE),
-                    ): cv.boolean,
-                }
+            data_schema=_options_schema(
+                data.get(CONF_POLL_INTERVAL, DEFAULT_POLL_INTERVAL),
+                data.get(CONF_MAX_RETRIES, DEFAULT_MAX_RETRIES),
+                data.get(CONF_TIMEOUT, DEFAULT_TIMEOUT),
+                data.get(CONF_RESTORE_STATE, DEFAULT_RESTORE_STATE),
             ),
         )
 
@@ -211,4 +236,11 @@ class CannotConnect(Exception):
 
 
 class InvalidAuth(Exception):
-    """Error to indicate there is invalid auth."""
\ No newline at end of file
+    """Error to indicate there is invalid auth."""
+
+
+# Translation keys for errors raised by validate_input
+_ERROR_MAP: dict[type[Exception], str] = {
+    CannotConnect: "cannot_connect",
+    InvalidAuth: "invalid_auth",
+}
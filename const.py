@@ -1,6 +1,9 @@
 """Constants for the Waveshare Relay integration."""
 DOMAIN = "waveshare_relay"
 
+# hass.data key for hubs validated by the config flow, keyed by (host, port)
+DATA_PENDING_HUBS = f"{DOMAIN}_pending"
+
 # Configuration keys
 CONF_HOST = "host"
 CONF_PORT = "port"
@@ -15,6 +18,9 @@ CONF_LAST_STATE = "last_state"
 CONF_LIGHTS = "lights"
 CONF_SWITCHES = "switches"
 
+# Relay counts offered by the config flow, in display order
+VALID_NUM_RELAYS = (8, 16, 32)
+
 # Default values
 DEFAULT_PORT = 502
 DEFAULT_DEVICE_ADDRESS = 0x01
@@ -25,6 +31,7 @@ DEFAULT_MAX_RETRIES = 3
 DEFAULT_RETRY_DELAY = 1.0
 DEFAULT_CIRCUIT_BREAKER_THRESHOLD = 5
 DEFAULT_CIRCUIT_BREAKER_TIMEOUT = 30.0
+DEFAULT_BATCH_MS = 20
 
 # Additional configuration keys
 CONF_POLL_INTERVAL = "poll_interval"
@@ -32,3 +39,4 @@ CONF_MAX_RETRIES = "max_retries"
 CONF_RETRY_DELAY = "retry_delay"
 CONF_CIRCUIT_BREAKER_THRESHOLD = "circuit_breaker_threshold"
 CONF_CIRCUIT_BREAKER_TIMEOUT = "circuit_breaker_timeout"
+CONF_BATCH_MS = "batch_ms"
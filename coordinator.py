@@ -1,4 +1,6 @@
 import logging
+import random
+import zlib
 from datetime import timedelta
 from typing import Dict, Any, Optional, List
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
@@ -6,6 +8,14 @@ from homeassistant.core import HomeAssistant
 
 _LOGGER = logging.getLogger(__name__)
 
+def _pack_relay_states(states: List[bool]) -> bytes:
+    """Pack relay states into a bitmap with relay 1 in bit 0 of byte 0."""
+    bitmap = bytearray((len(states) + 7) // 8)
+    for index, state in enumerate(states):
+        if state:
+            bitmap[index >> 3] |= 1 << (index & 7)
+    return bytes(bitmap)
+
 class WaveshareRelayCoordinator(DataUpdateCoordinator):
     """Class to manage polling and relay state updates with improved error handling."""
 
@@ -15,15 +25,22 @@ class WaveshareRelayCoordinator(DataUpdateCoordinator):
             _LOGGER,
             name=f"Waveshare Relay Hub {hub._host}",
             update_interval=timedelta(seconds=poll_interval),
+            # Skip listener callbacks when the relay bitmap did not change
+            always_update=False,
         )
         self.hub = hub
         self._consecutive_failures = 0
         self._max_consecutive_failures = 3
         self._base_poll_interval = poll_interval
         self._current_poll_interval = poll_interval
+        # Offset the first scheduled poll by a per-device amount so several
+        # hubs set up together, even behind one gateway, don't keep polling
+        # in the same instant
+        device_key = f"{hub._host}:{hub._port}:{hub._device_address}"
+        self._startup_offset = zlib.crc32(device_key.encode()) % max(poll_interval, 1)
 
-    async def _async_update_data(self) -> Dict[str, Any]:
-        """Fetch data from relay hub with improved error handling."""
+    async def _async_update_data(self) -> bytes:
+        """Fetch data from relay hub and return it as an immutable relay bitmap."""
         try:
             # Check if hub is available
             if not self.hub.is_available:
@@ -38,19 +55,15 @@ class WaveshareRelayCoordinator(DataUpdateCoordinator):
             
             # Success - reset failure count and polling interval
             self._consecutive_failures = 0
-            self._current_poll_interval = self._base_poll_interval
+            self._current_poll_interval = self._base_poll_interval + self._startup_offset
+            self._startup_offset = 0
             self.update_interval = timedelta(seconds=self._current_poll_interval)
             
-            return {
-                "relay_states": states,
-                "connection_stats": self.hub.connection_stats,
-                "last_update": self.last_update_success,
-                "hub_available": True,
-            }
+            return _pack_relay_states(states)
             
         except Exception as err:
             self._handle_failure()
-            _LOGGER.warning(f"Update failed for hub {self.hub._host}: {err}")
+            _LOGGER.warning("Update failed for hub %s: %s", self.hub._host, err)
             raise UpdateFailed(f"Failed to update relay states: {err}")
 
     def _handle_failure(self):
@@ -59,14 +72,19 @@ class WaveshareRelayCoordinator(DataUpdateCoordinator):
         
         # Implement exponential backoff for polling interval
         if self._consecutive_failures >= self._max_consecutive_failures:
-            self._current_poll_interval = min(
+            base = min(
                 self._base_poll_interval * (2 ** (self._consecutive_failures - self._max_consecutive_failures)),
                 300  # Max 5 minutes
             )
+            # Spread retries so hubs that failed together don't recover in lockstep
+            self._current_poll_interval = base * random.uniform(0.75, 1.25)
             self.update_interval = timedelta(seconds=self._current_poll_interval)
             _LOGGER.warning(
-                f"Hub {self.hub._host} has {self._consecutive_failures} consecutive failures, "
-                f"increasing poll interval to {self._current_poll_interval}s"
+                "Hub %s has %s consecutive failures, increasing poll interval to %.1fs (base %ss)",
+                self.hub._host,
+                self._consecutive_failures,
+                self._current_poll_interval,
+                base,
             )
 
     async def async_set_relay_state(self, relay_number: int, state: bool) -> bool:
@@ -74,13 +92,19 @@ class WaveshareRelayCoordinator(DataUpdateCoordinator):
         try:
             success = await self.hub.set_relay_state(relay_number, state)
             if success:
-                # Immediately refresh data after successful state change
-                await self.async_request_refresh()
+                # The device confirmed the write, so push the new bitmap to
+                # every entity in one pass instead of reading it back
+                self.async_set_updated_data(_pack_relay_states(self.hub._relay_states))
             return success
         except Exception as err:
-            _LOGGER.error(f"Failed to set relay {relay_number} state: {err}")
+            _LOGGER.error("Failed to set relay %s state: %s", relay_number, err)
             return False
 
+    def is_relay_on(self, address: int) -> bool:
+        """Return the last polled state of a relay (1-based address)."""
+        index = address - 1
+        return bool(self.data[index >> 3] & (1 << (index & 7)))
+
     @property
     def hub_available(self) -> bool:
         """Return if the hub is currently available."""
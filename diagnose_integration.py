@@ -25,9 +25,13 @@ def check_integration_files():
     
     print("📁 Checking Required Files:")
     all_files_exist = True
+    # One directory read instead of a stat per required file
+    with os.scandir('.') as it:
+        entries = {entry.name: entry for entry in it}
     for filename, description in required_files.items():
-        if os.path.exists(filename):
-            size = os.path.getsize(filename)
+        entry = entries.get(filename)
+        if entry is not None:
+            size = entry.stat().st_size
             print(f"   ✅ {filename:<15} ({size:>5} bytes) - {description}")
         else:
             print(f"   ❌ {filename:<15} - MISSING - {description}")
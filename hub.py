@@ -1,15 +1,79 @@
 import asyncio
 import logging
 import json
+import os
+import random
+import socket
+import struct
 import time
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from types import MappingProxyType
+from typing import Optional, Dict, Any, List, Set, Tuple
 from enum import Enum
-from dataclasses import dataclass
-from .const import CONF_LIGHTS, CONF_SWITCHES, CONF_RESTORE_STATE, DEFAULT_RESTORE_STATE, DOMAIN
+from dataclasses import dataclass, field
+
+try:
+    import orjson
+except ImportError:  # orjson ships with Home Assistant, but keep a stdlib fallback
+    orjson = None
+
+from .const import (
+    CONF_LIGHTS,
+    CONF_SWITCHES,
+    CONF_RESTORE_STATE,
+    CONF_BATCH_MS,
+    DEFAULT_RESTORE_STATE,
+    DEFAULT_BATCH_MS,
+    DOMAIN,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+def _crc16_table_entry(byte: int) -> int:
+    """Run the CRC-16 (Modbus) polynomial over a single byte."""
+    crc = byte
+    for _ in range(8):
+        crc = (crc >> 1) ^ 0xA001 if crc & 0x0001 else crc >> 1
+    return crc
+
+# Lookup table so the CRC loop does one step per byte instead of per bit
+_CRC16_MODBUS_TABLE = tuple(_crc16_table_entry(i) for i in range(256))
+
+# Relay toggles after which a batched write is sent without waiting further
+_MAX_BATCH_SIZE = 16
+
+# How long a status read stays fresh enough to answer further reads
+_STATUS_CACHE_TTL = 0.5
+
+# Close the persistent connection after this many seconds without a command
+_IDLE_TIMEOUT = 60.0
+
+# Seconds of silence before TCP keepalive starts probing the connection
+_KEEPALIVE_IDLE = 30
+
+# Seconds of quiet after a relay change before the states are saved to disk
+_STATE_SAVE_DELAY = 0.5
+
+# Request headers: address, function, start coil, coil count (, byte count)
+_READ_COILS = struct.Struct(">BBHH")
+_WRITE_COILS_HEADER = struct.Struct(">BBHHB")
+
+# Size of a write multiple coils reply: address, function, start, count, CRC
+_WRITE_RESPONSE_LEN = 8
+
+# Size of a Modbus exception response: address, function | 0x80, code, CRC
+_EXCEPTION_FRAME_LEN = 5
+
+def _crc16_int(data, crc: int = 0xFFFF) -> int:
+    """Calculate the CRC-16 (Modbus) checksum of data as an integer.
+
+    Passing the CRC of a prefix as crc continues the checksum from there.
+    """
+    table = _CRC16_MODBUS_TABLE
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
 class ConnectionState(Enum):
     """Connection state enumeration."""
     DISCONNECTED = "disconnected"
@@ -17,14 +81,28 @@ class ConnectionState(Enum):
     CONNECTED = "connected"
     FAILED = "failed"
 
+class CircuitBreakerState(Enum):
+    """Circuit breaker state enumeration."""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
 @dataclass
 class RetryConfig:
     """Retry configuration."""
     max_attempts: int = 3
-    base_delay: float = 1.0
-    max_delay: float = 60.0
+    base_delay: float = 0.05
+    max_delay: float = 0.5
     backoff_factor: float = 2.0
     jitter: bool = True
+    # Backoff before each retry, capped at max_delay; filled in from the above
+    delays: tuple = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.delays = tuple(
+            min(self.base_delay * (self.backoff_factor ** attempt), self.max_delay)
+            for attempt in range(max(self.max_attempts - 1, 1))
+        )
 
 @dataclass
 class CircuitBreakerConfig:
@@ -33,122 +111,259 @@ class CircuitBreakerConfig:
     recovery_timeout: float = 30.0
     half_open_max_calls: int = 3
 
+class GatewayConnection:
+    """TCP stream to a gateway, shared by the connection managers of its modules."""
+    
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        # Held for each request/response exchange; RTU frames carry no
+        # transaction ID, so only one exchange may be on the wire at a time
+        self.lock = asyncio.Lock()
+        
+        # Persistent connection, opened lazily and dropped on any error
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        # Modules accept few TCP clients, so free the slot when idle
+        self.idle_timeout = _IDLE_TIMEOUT
+        self._idle_handle: Optional[asyncio.TimerHandle] = None
+        self._idle_close_task: Optional[asyncio.Task] = None
+        
+    async def ensure_connected(self, timeout: float):
+        """Return the open connection, establishing it if needed."""
+        if self._writer is None or self._writer.is_closing():
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+            
+            sock = writer.get_extra_info("socket")
+            if sock is not None:
+                # Modbus frames are tiny; don't let Nagle hold them back
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                # Notice a peer that vanished while the connection sat idle
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+                if hasattr(socket, "TCP_KEEPIDLE"):
+                    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, _KEEPALIVE_IDLE)
+                if hasattr(socket, "TCP_USER_TIMEOUT"):
+                    sock.setsockopt(
+                        socket.IPPROTO_TCP, socket.TCP_USER_TIMEOUT, int(timeout * 1000)
+                    )
+            
+            self._reader, self._writer = reader, writer
+            _LOGGER.debug("Connected to %s:%s", self.host, self.port)
+            
+        return self._reader, self._writer
+
+    async def drop(self):
+        """Close the persistent connection so the next command reconnects."""
+        writer = self._writer
+        self._reader = None
+        self._writer = None
+        if writer is not None:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except Exception as e:
+                _LOGGER.debug("Error closing connection: %s", e)
+
+    def schedule_idle_close(self):
+        """Restart the countdown to closing the idle connection."""
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+        self._idle_handle = asyncio.get_running_loop().call_later(
+            self.idle_timeout, self._on_idle_timeout
+        )
+
+    def _on_idle_timeout(self):
+        """Close the connection once no command has used it for idle_timeout."""
+        self._idle_handle = None
+        if self._writer is not None:
+            _LOGGER.debug("Closing idle connection to %s:%s", self.host, self.port)
+            self._idle_close_task = asyncio.create_task(self.close())
+
+    async def close(self):
+        """Close the connection to the gateway."""
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        async with self.lock:
+            await self.drop()
+
 class ConnectionManager:
     """Manages TCP connection with retry logic and circuit breaker pattern."""
     
-    def __init__(self, host: str, port: int, timeout: float = 5.0):
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        timeout: float = 5.0,
+        connection: Optional[GatewayConnection] = None,
+    ):
         self.host = host
         self.port = port
         self.timeout = timeout
         self.state = ConnectionState.DISCONNECTED
-        self._connection_lock = asyncio.Lock()
         self._failure_count = 0
         self._last_failure_time = 0
-        self._circuit_breaker_open = False
+        self._circuit_state = CircuitBreakerState.CLOSED
         self._half_open_calls = 0
         
+        # Stream to the gateway, possibly shared with other modules behind it;
+        # the breaker, retries and timeout above stay with this device
+        self._connection = connection or GatewayConnection(host, port)
+        
         # Configuration
         self.retry_config = RetryConfig()
         self.circuit_breaker_config = CircuitBreakerConfig()
         
     async def _is_circuit_breaker_open(self) -> bool:
         """Check if circuit breaker is open."""
-        if not self._circuit_breaker_open:
+        state = self._circuit_state
+        if state is CircuitBreakerState.CLOSED:
             return False
             
-        # Check if we should attempt to close the circuit breaker
-        if (time.time() - self._last_failure_time) > self.circuit_breaker_config.recovery_timeout:
-            self._circuit_breaker_open = False
+        if state is CircuitBreakerState.OPEN:
+            # Stay open until the recovery timeout has passed
+            if (time.monotonic() - self._last_failure_time) <= self.circuit_breaker_config.recovery_timeout:
+                return True
+            self._circuit_state = CircuitBreakerState.HALF_OPEN
             self._half_open_calls = 0
             _LOGGER.info("Circuit breaker entering half-open state")
-            return False
             
-        return True
+        # Half-open: let a limited number of probe calls through
+        if self._half_open_calls >= self.circuit_breaker_config.half_open_max_calls:
+            return True
+        self._half_open_calls += 1
+        return False
         
     async def _record_success(self):
         """Record a successful operation."""
         self._failure_count = 0
-        if self._circuit_breaker_open:
-            self._circuit_breaker_open = False
+        if self._circuit_state is not CircuitBreakerState.CLOSED:
+            self._circuit_state = CircuitBreakerState.CLOSED
             _LOGGER.info("Circuit breaker closed after successful operation")
             
     async def _record_failure(self):
         """Record a failed operation."""
         self._failure_count += 1
-        self._last_failure_time = time.time()
+        self._last_failure_time = time.monotonic()
         
-        if self._failure_count >= self.circuit_breaker_config.failure_threshold:
-            self._circuit_breaker_open = True
-            _LOGGER.warning(f"Circuit breaker opened after {self._failure_count} failures")
+        # A failed probe reopens the breaker straight away
+        if (
+            self._circuit_state is CircuitBreakerState.HALF_OPEN
+            or self._failure_count >= self.circuit_breaker_config.failure_threshold
+        ):
+            self._circuit_state = CircuitBreakerState.OPEN
+            _LOGGER.warning("Circuit breaker opened after %s failures", self._failure_count)
             
-    async def send_command_with_retry(self, command: bytes) -> Optional[bytes]:
+    async def send_command_with_retry(
+        self, command: bytes, expected_len: Optional[int] = None
+    ) -> Optional[bytes]:
         """Send command with retry logic and circuit breaker."""
         if await self._is_circuit_breaker_open():
             _LOGGER.warning("Circuit breaker is open, skipping command")
             return None
             
         last_exception = None
+        retry_config = self.retry_config
         
-        for attempt in range(self.retry_config.max_attempts):
+        for attempt in range(retry_config.max_attempts):
             try:
-                async with self._connection_lock:
-                    result = await self._send_command_single(command)
+                async with self._connection.lock:
+                    result = await self._send_command_single(command, expected_len)
                     await self._record_success()
                     return result
                     
             except Exception as e:
                 last_exception = e
-                _LOGGER.warning(f"Command attempt {attempt + 1} failed: {e}")
+                _LOGGER.warning("Command attempt %s failed: %s", attempt + 1, e)
                 
-                if attempt < self.retry_config.max_attempts - 1:
-                    delay = min(
-                        self.retry_config.base_delay * (self.retry_config.backoff_factor ** attempt),
-                        self.retry_config.max_delay
-                    )
-                    if self.retry_config.jitter:
-                        delay *= (0.5 + 0.5 * time.time() % 1)  # Add jitter
+                if attempt < retry_config.max_attempts - 1:
+                    delays = retry_config.delays
+                    delay = delays[min(attempt, len(delays) - 1)]
+                    if retry_config.jitter:
+                        # Keep hubs sharing a gateway from retrying in lockstep
+                        delay += random.random() * retry_config.base_delay
                     await asyncio.sleep(delay)
                     
         await self._record_failure()
-        _LOGGER.error(f"All {self.retry_config.max_attempts} attempts failed. Last error: {last_exception}")
+        _LOGGER.error(
+            "All %s attempts failed. Last error: %s",
+            retry_config.max_attempts,
+            last_exception,
+        )
         return None
         
-    async def _send_command_single(self, command: bytes) -> bytes:
-        """Send a single command over TCP."""
-        self.state = ConnectionState.CONNECTING
-        writer = None
+    async def _read_frame(self, reader: asyncio.StreamReader, expected_len: int) -> bytes:
+        """Read one complete response frame and verify its CRC."""
+        # Every response is at least as long as an exception frame
+        head = await reader.readexactly(_EXCEPTION_FRAME_LEN)
+        if head[1] & 0x80:
+            response = head
+        else:
+            response = head + await reader.readexactly(expected_len - _EXCEPTION_FRAME_LEN)
         
+        # The CRC over a frame including its own CRC is zero
+        if _crc16_int(response) != 0:
+            raise ValueError(f"CRC mismatch in response: {response.hex(' ')}")
+        if head[1] & 0x80:
+            raise ValueError(f"Device returned Modbus exception code {head[2]}")
+        return response
+
+    async def _send_command_single(
+        self, command: bytes, expected_len: Optional[int] = None
+    ) -> bytes:
+        """Send a single command over the persistent TCP connection."""
         try:
-            reader, writer = await asyncio.wait_for(
-                asyncio.open_connection(self.host, self.port), 
-                timeout=self.timeout
-            )
-            
-            self.state = ConnectionState.CONNECTED
-            writer.write(command)
-            await writer.drain()
-            
-            response = await asyncio.wait_for(
-                reader.read(1024), 
-                timeout=self.timeout
-            )
+            # One deadline covers connecting, writing and reading the reply
+            async with asyncio.timeout(self.timeout):
+                reader, writer = await self._connection.ensure_connected(self.timeout)
+                self.state = ConnectionState.CONNECTED
+                writer.write(command)
+                await writer.drain()
+                
+                if expected_len is None:
+                    response = await reader.read(1024)
+                else:
+                    response = await self._read_frame(reader, expected_len)
             
+            self._connection.schedule_idle_close()
             return response
             
         except asyncio.TimeoutError as e:
+            await self._connection.drop()
             self.state = ConnectionState.FAILED
-            raise ConnectionError(f"Timeout connecting to {self.host}:{self.port}")
+            raise ConnectionError(f"Timeout communicating with {self.host}:{self.port}")
         except Exception as e:
+            await self._connection.drop()
             self.state = ConnectionState.FAILED
             raise ConnectionError(f"Failed to communicate with {self.host}:{self.port}: {e}")
-        finally:
-            if writer:
-                try:
-                    writer.close()
-                    await writer.wait_closed()
-                except Exception as e:
-                    _LOGGER.debug(f"Error closing connection: {e}")
-            self.state = ConnectionState.DISCONNECTED
+
+    async def close(self):
+        """Close the connection to the relay hub."""
+        await self._connection.close()
+        self.state = ConnectionState.DISCONNECTED
+
+# Gateway connections keyed by (host, port), each with the hubs using it, so
+# modules behind one gateway share its scarce TCP client slots
+_GATEWAY_CONNECTIONS: Dict[Tuple[str, int], Tuple[GatewayConnection, Set[Any]]] = {}
+
+def _acquire_gateway_connection(hub, host: str, port: int) -> GatewayConnection:
+    """Return the connection to a gateway, creating it for its first hub."""
+    entry = _GATEWAY_CONNECTIONS.get((host, port))
+    if entry is None:
+        entry = _GATEWAY_CONNECTIONS[(host, port)] = (GatewayConnection(host, port), set())
+    entry[1].add(hub)
+    return entry[0]
+
+def _release_gateway_connection(hub, host: str, port: int) -> bool:
+    """Stop a hub sharing its gateway connection; return True if it was the last user."""
+    entry = _GATEWAY_CONNECTIONS.get((host, port))
+    if entry is None:
+        return True
+    entry[1].discard(hub)
+    if entry[1]:
+        return False
+    del _GATEWAY_CONNECTIONS[(host, port)]
+    return True
 
 class WaveshareRelayHub:
     """Hub to manage all the Waveshare Relays."""
@@ -163,22 +378,69 @@ class WaveshareRelayHub:
         # Get the total number of relays from the device
         self._num_relays = config.get("num_relays", 32)  # Default to 32 if not specified
         self._relay_states = [False] * self._num_relays
-        self._lock = asyncio.Lock()
+        # Same states packed as an integer, bit 0 = relay 1, kept in step
+        # with _relay_states so writes don't have to rebuild it
+        self._bit_pattern = 0
+        # Bit pattern the device last confirmed, by a write reply or a read
+        self._confirmed_pattern = 0
+        # Write shared by relay toggles that arrive within the coalescing window
+        self._pending_write: Optional[asyncio.Future] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._batch_delay = config.get(CONF_BATCH_MS, DEFAULT_BATCH_MS) / 1000
+        self._batch_size = 0
+        self._flush_now = asyncio.Event()
+        # Keeps relay writes, retries included, going out in the order they
+        # were made so an older bitmap can never land after a newer one
+        self._flush_lock = asyncio.Lock()
+        # Status read shared by concurrent read_relay_status callers
+        self._read_inflight: Optional[asyncio.Task] = None
+        self._last_read = 0.0
+        self._cache_ttl = _STATUS_CACHE_TTL
         self._byte_size = (self._num_relays + 7) // 8
+        self._relay_mask = (1 << self._num_relays) - 1
+        
+        # Frame parts that never change for this device
+        self._write_header = _WRITE_COILS_HEADER.pack(
+            self._device_address, 0x0F, 0, self._num_relays, self._byte_size
+        )
+        # Write frame buffer: header, coil payload, CRC; only the tail changes
+        self._write_buffer = bytearray(len(self._write_header) + self._byte_size + 2)
+        self._write_buffer[:len(self._write_header)] = self._write_header
+        self._write_crc_seed = _crc16_int(self._write_header)
+        read_query = _READ_COILS.pack(self._device_address, 0x01, 0, self._num_relays)
+        self._read_command = read_query + self.calculate_crc(read_query)
+        # Read coils reply: address, function, byte count, status bytes, CRC
+        self._read_response_len = 5 + self._byte_size
         
         # Connection management
-        self._connection_manager = ConnectionManager(self._host, self._port, self._timeout)
-        self._last_successful_communication = 0
+        # The stream is shared with other hubs on the same gateway; RTU frames
+        # carry the device address and its lock keeps exchanges in order.
+        # Retries, timeout and circuit breaker stay per hub, so one failing
+        # module doesn't take the others on its gateway offline with it.
+        self._connection_manager = ConnectionManager(
+            self._host,
+            self._port,
+            self._timeout,
+            _acquire_gateway_connection(self, self._host, self._port),
+        )
+        # time.monotonic() of the last successful command, None until one succeeds
+        self._last_successful_communication: Optional[float] = None
         self._is_available = True
         
         # Last state configuration
         self._restore_state = config.get(CONF_RESTORE_STATE, DEFAULT_RESTORE_STATE)
         self._state_file = None
+        self._save_handle: Optional[asyncio.TimerHandle] = None
+        self._save_task: Optional[asyncio.Task] = None
         if self._hass and self._restore_state:
             self._state_file = Path(self._hass.config.config_dir) / f"{DOMAIN}_{self._host}_{self._port}.json"
         
         # Track which relays are actually configured
         self._configured_relays = self._get_configured_relays(config)
+        # Same relays as a bit mask, bit 0 = relay 1, for the per-write check
+        self._configured_mask = 0
+        for relay_num in self._configured_relays:
+            self._configured_mask |= 1 << (relay_num - 1)
         
         # Performance monitoring
         self._command_stats = {
@@ -187,6 +449,8 @@ class WaveshareRelayHub:
             "failed_commands": 0,
             "average_response_time": 0.0
         }
+        # Read-only live view handed out by connection_stats
+        self._command_stats_view = MappingProxyType(self._command_stats)
         
         _LOGGER.debug(
             "Initialized WaveshareRelayHub: host=%s, port=%s, num_relays=%s, configured_relays=%s, restore_state=%s",
@@ -198,7 +462,7 @@ class WaveshareRelayHub:
         )
 
     def _get_configured_relays(self, config):
-        """Get a set of relay numbers that are actually configured."""
+        """Get a frozenset of relay numbers that are actually configured."""
         configured = set()
         
         # Check lights
@@ -209,7 +473,7 @@ class WaveshareRelayHub:
         for switch in config.get(CONF_SWITCHES, []):
             configured.add(switch["address"])
             
-        return configured
+        return frozenset(configured)
 
     @classmethod
     async def create(cls, config, hass=None):
@@ -218,79 +482,189 @@ class WaveshareRelayHub:
         await self.read_relay_status()
         return self
 
+    async def close(self):
+        """Release the hub's connection resources."""
+        # Drop a relay write that hasn't gone out; its callers see it fail
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        self._flush_task = None
+        if self._pending_write is not None:
+            self._pending_write.set_result(False)
+            self._pending_write = None
+        
+        # Don't lose a state save that is still waiting out its debounce
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+            await self._save_last_states()
+        if _release_gateway_connection(self, self._host, self._port):
+            await self._connection_manager.close()
+        else:
+            self._connection_manager.state = ConnectionState.DISCONNECTED
+
+    def _read_state_file(self) -> Optional[Dict[str, Any]]:
+        """Read the saved states from disk; runs in the executor."""
+        if not self._state_file.exists():
+            return None
+        with open(self._state_file, 'r') as f:
+            return json.load(f)
+
     async def _load_last_states(self):
         """Load last known states from file."""
-        if not self._state_file or not self._state_file.exists():
+        if not self._state_file:
             _LOGGER.debug("No last state file found, using default states")
             return
             
         try:
-            with open(self._state_file, 'r') as f:
-                saved_states = json.load(f)
-                _LOGGER.debug("Loaded last states: %s", saved_states)
-                
-                # Apply saved states to configured relays only
-                for relay_num, state in saved_states.items():
-                    relay_num = int(relay_num)
-                    if relay_num in self._configured_relays and 1 <= relay_num <= self._num_relays:
-                        self._relay_states[relay_num - 1] = state
-                        _LOGGER.debug("Restored relay %s to state: %s", relay_num, state)
-                        
+            saved_states = await self._hass.async_add_executor_job(self._read_state_file)
         except (json.JSONDecodeError, IOError) as e:
             _LOGGER.warning("Failed to load last states: %s", e)
+            return
+            
+        if saved_states is None:
+            _LOGGER.debug("No last state file found, using default states")
+            return
+            
+        _LOGGER.debug("Loaded last states: %s", saved_states)
+        
+        # Apply saved states to configured relays only
+        for relay_num, state in saved_states.items():
+            relay_num = int(relay_num)
+            if relay_num in self._configured_relays and 1 <= relay_num <= self._num_relays:
+                self._set_state(relay_num, state)
+                _LOGGER.debug("Restored relay %s to state: %s", relay_num, state)
+
+    def _write_state_file(self, states_to_save: Dict[str, bool]):
+        """Atomically write the states to disk; runs in the executor."""
+        # Create directory if it doesn't exist
+        self._state_file.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Write a temporary file and swap it in so a crash never leaves half a file
+        tmp_file = self._state_file.with_name(self._state_file.name + ".tmp")
+        if orjson is not None:
+            data = orjson.dumps(states_to_save)
+        else:
+            data = json.dumps(states_to_save).encode()
+        with open(tmp_file, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_file, self._state_file)
 
     async def _save_last_states(self):
         """Save current states to file."""
         if not self._state_file:
             return
             
+        # Save only configured relay states
+        states_to_save = {}
+        for relay_num in self._configured_relays:
+            if 1 <= relay_num <= self._num_relays:
+                states_to_save[str(relay_num)] = self._relay_states[relay_num - 1]
+        
         try:
-            # Create directory if it doesn't exist
-            self._state_file.parent.mkdir(parents=True, exist_ok=True)
-            
-            # Save only configured relay states
-            states_to_save = {}
-            for relay_num in self._configured_relays:
-                if 1 <= relay_num <= self._num_relays:
-                    states_to_save[str(relay_num)] = self._relay_states[relay_num - 1]
-            
-            with open(self._state_file, 'w') as f:
-                json.dump(states_to_save, f)
-                
+            await self._hass.async_add_executor_job(self._write_state_file, states_to_save)
             _LOGGER.debug("Saved last states: %s", states_to_save)
-            
         except IOError as e:
             _LOGGER.error("Failed to save last states: %s", e)
 
+    def _schedule_save_last_states(self):
+        """Save the states once toggling has been quiet for a moment."""
+        if not self._state_file:
+            return
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+        self._save_handle = asyncio.get_running_loop().call_later(
+            _STATE_SAVE_DELAY, self._start_save_last_states
+        )
+
+    def _start_save_last_states(self):
+        """Run the debounced state save."""
+        self._save_handle = None
+        self._save_task = asyncio.create_task(self._save_last_states())
+
     async def set_relay_state(self, relay_number, state):
-        """Set an individual relay state and immediately send the update."""
+        """Set an individual relay state and send it with any concurrent changes."""
         if relay_number < 1 or relay_number > self._num_relays:
             _LOGGER.error("Invalid relay number: %s (must be between 1 and %s)", relay_number, self._num_relays)
             raise ValueError(f"Invalid relay number: {relay_number} (must be between 1 and {self._num_relays})")
             
-        if relay_number not in self._configured_relays:
+        if not (self._configured_mask >> (relay_number - 1)) & 1:
             _LOGGER.error("Relay %s is not configured", relay_number)
             raise ValueError(f"Relay {relay_number} is not configured")
             
-        async with self._lock:
-            # Update the relay state
-            self._relay_states[relay_number - 1] = state
-            _LOGGER.debug(
-                "Setting relay %s to %s, current states: %s",
-                relay_number,
-                state,
-                self._relay_states
-            )
+        # Nothing to send if the device already has this state and no
+        # other change is waiting to go out
+        if (
+            self._pending_write is None
+            and self._bit_pattern == self._confirmed_pattern
+            and bool(self._bit_pattern >> (relay_number - 1) & 1) == state
+        ):
+            _LOGGER.debug("Relay %s is already %s, skipping write", relay_number, state)
+            return True
             
-            # Save the new state
-            await self._save_last_states()
+        # Update the relay state; it goes out with the next flush
+        self._set_state(relay_number, state)
+        _LOGGER.debug(
+            "Setting relay %s to %s, current states: %s",
+            relay_number,
+            state,
+            self._relay_states
+        )
+        
+        if self._pending_write is None:
+            self._pending_write = asyncio.get_running_loop().create_future()
+            self._batch_size = 0
+            self._flush_now.clear()
+            self._flush_task = asyncio.create_task(self._flush_relay_states())
+        self._batch_size += 1
+        if self._batch_size >= _MAX_BATCH_SIZE:
+            self._flush_now.set()
+        return await asyncio.shield(self._pending_write)
+
+    async def _flush_relay_states(self):
+        """Send all relay changes made during the coalescing window in one frame."""
+        try:
+            # Wait out the batch window unless the batch fills up first
+            await asyncio.wait_for(self._flush_now.wait(), self._batch_delay)
+        except asyncio.TimeoutError:
+            pass
+        
+        # Close the batch and snapshot its bitmap in one step; later changes
+        # start a new batch with their own snapshot
+        future = self._pending_write
+        self._pending_write = None
+        bit_pattern = self._bit_pattern
+        try:
+            # Persist the new state once the burst of changes settles
+            self._schedule_save_last_states()
             
-            # Send the updated relay states immediately
-            response = await self._send_relay_states()
-            # Return success or failure based on response
-            if response is None:
-                _LOGGER.error("Failed to send relay states to device")
-            return response is not None
+            # Send the snapshot once any earlier write has finished all of its
+            # retries, so snapshots reach the device in the order they were taken
+            async with self._flush_lock:
+                response = await self._send_relay_states(bit_pattern)
+        except asyncio.CancelledError:
+            # The hub is closing; the write never reached the device
+            future.set_result(False)
+            raise
+        except Exception as err:  # pylint: disable=broad-except
+            future.set_exception(err)
+            return
+        
+        # Return success or failure based on response
+        if response is None:
+            _LOGGER.error("Failed to send relay states to device")
+        future.set_result(response is not None)
+
+    def _set_state(self, relay_number, state):
+        """Record a relay state in both the state list and the bit pattern."""
+        self._relay_states[relay_number - 1] = state
+        if state:
+            self._bit_pattern |= 1 << (relay_number - 1)
+        else:
+            self._bit_pattern &= ~(1 << (relay_number - 1))
 
     async def restore_last_states(self):
         """Restore last known states to the device."""
@@ -299,6 +673,8 @@ class WaveshareRelayHub:
             return
             
         await self._load_last_states()
+        # The loaded states may not be what the device has; read it afresh
+        self._last_read = 0.0
         
         # Check if we have any saved states to restore
         has_saved_states = any(self._relay_states)
@@ -309,50 +685,54 @@ class WaveshareRelayHub:
         _LOGGER.info("Restoring last known relay states")
         
         # Send the restored states to the device
-        response = await self._send_relay_states()
+        async with self._flush_lock:
+            response = await self._send_relay_states()
         if response is None:
             _LOGGER.error("Failed to restore relay states to device")
         else:
             _LOGGER.info("Successfully restored relay states")
 
-    async def _send_relay_states(self):
-        """Prepare and send the updated relay state command."""
-        bit_pattern = sum((1 << i) for i, relay_state in enumerate(self._relay_states) if relay_state)
-
-        # Convert the bit pattern to bytes in little-endian format
-        bit_pattern_bytes = bit_pattern.to_bytes(self._byte_size)
-        # Build the RS485 command
-        rs485_command = bytes([self._device_address, 0x0F, 0x00, 0x00, 0x00, self._num_relays, self._byte_size]) + bit_pattern_bytes
+    async def _send_relay_states(self, bit_pattern: Optional[int] = None):
+        """Prepare and send a relay state command, by default for the current states."""
+        if bit_pattern is None:
+            bit_pattern = self._bit_pattern
+        # Relay 1 goes in the lowest bit of the last byte, matching the
+        # order read_relay_status decodes
+        buffer = self._write_buffer
+        buffer[7:-2] = bit_pattern.to_bytes(self._byte_size, byteorder='big')
 
-        # Calculate CRC and append it to the command
-        crc = self.calculate_crc(rs485_command)
-        rs485_command += crc
+        # Continue the header's CRC over the payload and write it at the end
+        crc = _crc16_int(memoryview(buffer)[7:-2], self._write_crc_seed)
+        buffer[-2] = crc & 0xFF
+        buffer[-1] = crc >> 8
+        rs485_command = bytes(buffer)
         
-        _LOGGER.debug(
-            "Sending command to device: %s",
-            ' '.join(f'{b:02x}' for b in rs485_command)
-        )
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("Sending command to device: %s", rs485_command.hex(' '))
         
         # Send command to the relay hub
-        response = await self.send_command(rs485_command)
+        response = await self.send_command(rs485_command, _WRITE_RESPONSE_LEN)
         
         if response:
-            _LOGGER.debug(
-                "Received response from device: %s",
-                ' '.join(f'{b:02x}' for b in response)
-            )
+            self._confirmed_pattern = bit_pattern
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                _LOGGER.debug("Received response from device: %s", response.hex(' '))
         
         return response
 
-    async def send_command(self, command):
-        """Handle the TCP connection to the relay hub with timeout and retry logic."""
-        start_time = time.time()
+    async def send_command(self, command, expected_len=None):
+        """Handle the TCP connection to the relay hub with timeout and retry logic.
+
+        When expected_len is given, exactly that many bytes are read and the
+        response CRC is checked; otherwise whatever arrives first is returned.
+        """
+        start_time = time.monotonic()
         
         try:
-            response = await self._connection_manager.send_command_with_retry(command)
+            response = await self._connection_manager.send_command_with_retry(command, expected_len)
             
             # Update statistics
-            end_time = time.time()
+            end_time = time.monotonic()
             response_time = end_time - start_time
             self._update_command_stats(success=response is not None, response_time=response_time)
             
@@ -365,71 +745,96 @@ class WaveshareRelayHub:
             return response
             
         except Exception as err:
-            self._update_command_stats(success=False, response_time=time.time() - start_time)
+            self._update_command_stats(success=False, response_time=time.monotonic() - start_time)
             self._is_available = False
             _LOGGER.error("Failed to communicate with device: %s", err)
             return None
 
     def _update_command_stats(self, success: bool, response_time: float):
         """Update command statistics."""
-        self._command_stats["total_commands"] += 1
+        stats = self._command_stats
+        total = stats["total_commands"] = stats["total_commands"] + 1
         
         if success:
-            self._command_stats["successful_commands"] += 1
+            stats["successful_commands"] += 1
         else:
-            self._command_stats["failed_commands"] += 1
+            stats["failed_commands"] += 1
             
-        # Update average response time
-        total = self._command_stats["total_commands"]
-        current_avg = self._command_stats["average_response_time"]
-        self._command_stats["average_response_time"] = (
-            (current_avg * (total - 1) + response_time) / total
-        )
+        # Running mean, updated in place
+        stats["average_response_time"] += (response_time - stats["average_response_time"]) / total
 
     @property
     def is_available(self) -> bool:
         """Return if the hub is available."""
-        return self._is_available and (
-            time.time() - self._last_successful_communication < 300  # 5 minutes
+        last = self._last_successful_communication
+        return self._is_available and last is not None and (
+            time.monotonic() - last < 300  # 5 minutes
         )
 
+    @property
+    def last_successful_communication_time(self) -> float:
+        """Return the wall-clock timestamp of the last successful command, or 0."""
+        last = self._last_successful_communication
+        if last is None:
+            return 0
+        return time.time() - (time.monotonic() - last)
+
     @property
     def connection_stats(self) -> Dict[str, Any]:
         """Return connection statistics."""
         return {
             "connection_state": self._connection_manager.state.value,
             "is_available": self.is_available,
-            "last_successful_communication": self._last_successful_communication,
-            "command_stats": self._command_stats.copy(),
-            "circuit_breaker_open": self._connection_manager._circuit_breaker_open,
+            "last_successful_communication": self.last_successful_communication_time,
+            "command_stats": self._command_stats_view,
+            "circuit_breaker_open": self._connection_manager._circuit_state is CircuitBreakerState.OPEN,
             "failure_count": self._connection_manager._failure_count,
         }
 
     async def read_relay_status(self):
-        """Read the status of all relays, fully reversing the byte and bit order."""
-        query_command = bytes([self._device_address, 0x01, 0x00, 0x00, 0x00, self._num_relays])
-        crc = self.calculate_crc(query_command)
-        query_command += crc
+        """Read the status of all relays, sharing any read already in flight."""
+        if time.monotonic() - self._last_read < self._cache_ttl:
+            return self._relay_states
+        if self._read_inflight is None:
+            self._read_inflight = asyncio.create_task(self._read_relay_status())
+            self._read_inflight.add_done_callback(self._clear_read_inflight)
+        return await asyncio.shield(self._read_inflight)
 
-        _LOGGER.debug(
-            "Sending status query to device: %s",
-            ' '.join(f'{b:02x}' for b in query_command)
-        )
+    def _clear_read_inflight(self, task):
+        """Let the next read_relay_status call start a new read."""
+        self._read_inflight = None
+
+    async def _read_relay_status(self):
+        """Query the device for the status of all relays."""
+        query_command = self._read_command
 
-        response = await self.send_command(query_command)
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("Sending status query to device: %s", query_command.hex(' '))
 
-        if response is None or len(response) < 5 + (self._num_relays + 7) // 8:
+        response = await self.send_command(query_command, self._read_response_len)
+
+        if response is None or len(response) < self._read_response_len:
             _LOGGER.error("Invalid response from device when reading status")
             return None
 
         # Extract the status bytes (exclude address, function code, and CRC)
         status_bytes = response[3:-2]
 
-        # Convert bytes to a full binary string and reverse the order
-        full_binary = ''.join(f"{byte:08b}" for byte in status_bytes)[::-1]
-
-        # Convert binary string into relay status list
-        self._relay_states = [bit == "1" for bit in full_binary[:self._num_relays]]
+        # Relay 1 is the lowest bit of the last status byte, i.e. bit 0 of the
+        # bytes read as a big-endian integer
+        num_relays = self._num_relays
+        value = int.from_bytes(status_bytes, byteorder='big') & self._relay_mask
+        self._confirmed_pattern = value
+        if self._pending_write is None and not self._flush_lock.locked() and (
+            self._flush_task is None or self._flush_task.done()
+        ):
+            self._bit_pattern = value
+            self._relay_states = [(value >> i) & 1 == 1 for i in range(num_relays)]
+        else:
+            # A write is queued or in flight; keep the states it will send
+            # rather than rolling them back to what the device had before
+            _LOGGER.debug("Relay write pending, keeping unsent relay states")
+        self._last_read = time.monotonic()
         
         _LOGGER.debug(
             "Read relay status: %s",
@@ -441,9 +846,4 @@ class WaveshareRelayHub:
     @staticmethod
     def calculate_crc(data):
         """Calculate CRC-16 (Modbus) checksum."""
-        crc = 0xFFFF
-        for byte in data:
-            crc ^= byte
-            for _ in range(8):
-                crc = (crc >> 1) ^ 0xA001 if crc & 0x0001 else crc >> 1
-        return crc.to_bytes(2, byteorder='little')
+        return _crc16_int(data).to_bytes(2, byteorder='little')
@@ -2,6 +2,10 @@
 """
 Mock Modbus TCP Server for Waveshare Relay Testing
 This simulates the relay device for local testing without hardware
+
+By default it speaks Modbus RTU over TCP (raw RTU frames with a CRC and no
+MBAP header), like the Waveshare module and the integration's hub. Pass
+rtu=False for standard Modbus TCP framing.
 """
 
 import asyncio
@@ -14,13 +18,36 @@ from typing import Dict, List
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Precompiled Modbus layouts: MBAP header with unit and function code,
+# and the start address / coil count pair that opens coil requests
+_MBAP = struct.Struct('>HHHBB')
+_COIL_RANGE = struct.Struct('>HH')
+_MBAP_LENGTH = struct.Struct('>H')
+
+# RTU request prefix: address, function, start address, coil count
+_RTU_PREFIX_LEN = 6
+
+def crc16_modbus(data: bytes) -> int:
+    """Calculate the CRC-16 (Modbus) of an RTU frame"""
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+    return crc
+
 class MockModbusServer:
     """Mock Modbus TCP server that simulates the Waveshare relay"""
     
-    def __init__(self, host='0.0.0.0', port=502):
+    def __init__(self, host='0.0.0.0', port=502, rtu=True):
         self.host = host
         self.port = port
-        self.relay_states = [False] * 32  # 32 relays, all initially off
+        self.rtu = rtu
+        # The Waveshare module puts relay 1 in the lowest bit of the last
+        # coil byte; standard Modbus TCP puts it in the first byte
+        self.byteorder = 'big' if rtu else 'little'
+        self.num_relays = 32
+        self.relay_bits = 0  # Relay states as a bitmap, bit 0 = relay 1, all initially off
         self.server = None
         self.running = False
         
@@ -33,7 +60,7 @@ class MockModbusServer:
             self.running = True
             
             logger.info(f"🚀 Mock Modbus server started on {self.host}:{self.port}")
-            logger.info(f"🔌 Simulating 32 relays")
+            logger.info(f"🔌 Simulating {self.num_relays} relays")
             logger.info(f"📱 Use this IP in your Home Assistant configuration")
             
             async with self.server:
@@ -50,15 +77,25 @@ class MockModbusServer:
         
         try:
             while True:
-                # Read Modbus request
-                data = await reader.read(256)
-                if not data:
+                try:
+                    if self.rtu:
+                        data = await self.read_rtu_frame(reader)
+                    else:
+                        # Read one whole Modbus request: the MBAP prefix
+                        # says how many bytes follow it
+                        prefix = await reader.readexactly(6)
+                        length = _MBAP_LENGTH.unpack_from(prefix, 4)[0]
+                        data = prefix + await reader.readexactly(length)
+                except asyncio.IncompleteReadError:
                     break
                     
                 # Parse and handle the request
-                response = await self.process_modbus_request(data)
+                if self.rtu:
+                    response = self.process_rtu_request(data)
+                else:
+                    response = await self.process_modbus_request(data)
                 if response:
-                    writer.write(response)
+                    writer.write(memoryview(response))
                     await writer.drain()
                     
         except Exception as e:
@@ -68,94 +105,131 @@ class MockModbusServer:
             await writer.wait_closed()
             logger.info(f"🔌 Client {addr} disconnected")
             
-    async def process_modbus_request(self, data: bytes) -> bytes:
+    async def process_modbus_request(self, data: bytes) -> bytearray:
         """Process Modbus request and return response"""
         if len(data) < 12:  # Minimum Modbus TCP header
             return None
             
         try:
             # Parse Modbus TCP header
-            transaction_id = struct.unpack('>H', data[0:2])[0]
-            protocol_id = struct.unpack('>H', data[2:4])[0]
-            length = struct.unpack('>H', data[4:6])[0]
-            unit_id = data[6]
-            function_code = data[7]
+            transaction_id, protocol_id, length, unit_id, function_code = _MBAP.unpack_from(data)
             
-            logger.debug(f"📨 Modbus request: function={function_code}, unit={unit_id}")
+            logger.debug("📨 Modbus request: function=%s, unit=%s", function_code, unit_id)
             
             # Handle different function codes
             if function_code == 0x01:  # Read Coils
-                response = self.handle_read_coils(data[8:])
+                response = self.handle_read_coils(memoryview(data)[8:])
             elif function_code == 0x0F:  # Write Multiple Coils
-                response = self.handle_write_multiple_coils(data[8:])
+                response = self.handle_write_multiple_coils(memoryview(data)[8:])
             else:
-                logger.warning(f"⚠️ Unsupported function code: {function_code}")
+                logger.warning("⚠️ Unsupported function code: %s", function_code)
                 response = self.create_error_response(function_code, 0x01)  # Illegal function
                 
             if response:
                 # Build Modbus TCP response header
                 response_length = len(response) + 2  # +2 for unit_id and function_code
-                header = struct.pack('>HHHBB', 
-                                   transaction_id, protocol_id, response_length, unit_id, function_code)
-                return header + response
+                frame = bytearray(8 + len(response))
+                _MBAP.pack_into(frame, 0,
+                                transaction_id, protocol_id, response_length, unit_id, function_code)
+                frame[8:] = response
+                return frame
                 
-        except Exception as e:
-            logger.error(f"❌ Error processing request: {e}")
+        except (struct.error, IndexError, ValueError) as e:
+            logger.error("❌ Error processing request: %s", e)
             
         return None
         
+    async def read_rtu_frame(self, reader) -> bytes:
+        """Read one whole RTU request; its length follows from the function code"""
+        prefix = await reader.readexactly(_RTU_PREFIX_LEN)
+        if prefix[1] == 0x0F:  # Write Multiple Coils carries a byte count and data
+            byte_count = await reader.readexactly(1)
+            return prefix + byte_count + await reader.readexactly(byte_count[0] + 2)
+        return prefix + await reader.readexactly(2)
+        
+    def process_rtu_request(self, data: bytes) -> bytes:
+        """Process an RTU request and return the RTU response, CRC included"""
+        if crc16_modbus(data) != 0:
+            # A real device stays silent on a corrupted frame
+            logger.warning("⚠️ Dropping RTU request with bad CRC: %s", data.hex(' '))
+            return None
+            
+        unit_id, function_code = data[0], data[1]
+        logger.debug("📨 Modbus RTU request: function=%s, unit=%s", function_code, unit_id)
+        
+        try:
+            pdu = memoryview(data)[2:-2]
+            if function_code == 0x01:  # Read Coils
+                response = self.handle_read_coils(pdu)
+            elif function_code == 0x0F:  # Write Multiple Coils
+                response = self.handle_write_multiple_coils(pdu)
+            else:
+                logger.warning("⚠️ Unsupported function code: %s", function_code)
+                response = None
+        except (struct.error, IndexError, ValueError) as e:
+            logger.error("❌ Error processing request: %s", e)
+            return None
+            
+        if not response:
+            # Exception reply: the error code follows the flagged function code
+            response = self.create_error_response(function_code, 0x01)[1:]  # Illegal function
+            function_code |= 0x80
+            
+        # Build the RTU response: unit_id, function_code, data, CRC
+        frame = bytearray(4 + len(response))
+        frame[0] = unit_id
+        frame[1] = function_code
+        frame[2:-2] = response
+        frame[-2:] = crc16_modbus(memoryview(frame)[:-2]).to_bytes(2, 'little')
+        return frame
+        
     def handle_read_coils(self, data: bytes) -> bytes:
         """Handle Read Coils (0x01) function"""
         if len(data) < 4:
             return None
             
-        start_address = struct.unpack('>H', data[0:2])[0]
-        coil_count = struct.unpack('>H', data[2:4])[0]
+        start_address, coil_count = _COIL_RANGE.unpack_from(data)
         
-        logger.debug(f"📖 Read coils: start={start_address}, count={coil_count}")
+        logger.debug("📖 Read coils: start=%d, count=%d", start_address, coil_count)
         
         # Calculate byte count
         byte_count = (coil_count + 7) // 8
         
-        # Build response
-        response = bytes([byte_count])
-        
-        # Pack relay states into bytes
-        for i in range(byte_count):
-            byte_value = 0
-            for bit in range(8):
-                relay_index = start_address + i * 8 + bit
-                if relay_index < len(self.relay_states) and self.relay_states[relay_index]:
-                    byte_value |= (1 << bit)
-            response += bytes([byte_value])
+        # Shift the requested coils down to bit 0 and pack them in the device's byte order
+        value = (self.relay_bits >> start_address) & ((1 << coil_count) - 1)
+        response = bytearray(1 + byte_count)
+        response[0] = byte_count
+        response[1:] = value.to_bytes(byte_count, self.byteorder)
             
-        return response
+        return bytes(response)
         
     def handle_write_multiple_coils(self, data: bytes) -> bytes:
         """Handle Write Multiple Coils (0x0F) function"""
         if len(data) < 6:
             return None
             
-        start_address = struct.unpack('>H', data[0:2])[0]
-        coil_count = struct.unpack('>H', data[2:4])[0]
+        start_address, coil_count = _COIL_RANGE.unpack_from(data)
         byte_count = data[4]
         coil_values = data[5:5+byte_count]
         
-        logger.debug(f"✏️ Write coils: start={start_address}, count={coil_count}")
+        logger.debug("✏️ Write coils: start=%d, count=%d", start_address, coil_count)
         
-        # Update relay states
-        for i in range(coil_count):
-            relay_index = start_address + i
-            if relay_index < len(self.relay_states):
-                byte_index = i // 8
-                bit_index = i % 8
-                if byte_index < len(coil_values):
-                    self.relay_states[relay_index] = bool(coil_values[byte_index] & (1 << bit_index))
+        # Replace the written range of coils, ignoring any beyond the last relay
+        coil_mask = ((1 << coil_count) - 1) << start_address
+        coil_mask &= (1 << self.num_relays) - 1
+        incoming = int.from_bytes(coil_values, self.byteorder) << start_address
+        self.relay_bits = (self.relay_bits & ~coil_mask) | (incoming & coil_mask)
                     
-        logger.info(f"🔌 Relay states updated: {self.relay_states[:8]}...")  # Show first 8
+        if logger.isEnabledFor(logging.INFO):
+            first_states = [bool(self.relay_bits >> i & 1) for i in range(8)]
+            logger.info("🔌 Relay states updated: %s...", first_states)  # Show first 8
         
         # Return success response
-        return struct.pack('>HH', start_address, coil_count)
+        return _COIL_RANGE.pack(start_address, coil_count)
+        
+    def snapshot_bytes(self) -> bytes:
+        """Return all relay states packed like a Read Coils payload"""
+        return self.relay_bits.to_bytes((self.num_relays + 7) // 8, self.byteorder)
         
     def create_error_response(self, function_code: int, error_code: int) -> bytes:
         """Create Modbus error response"""
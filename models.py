@@ -0,0 +1,15 @@
+"""Data models for the Waveshare Relay integration."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from .coordinator import WaveshareRelayCoordinator
+from .hub import WaveshareRelayHub
+
+
+@dataclass(slots=True)
+class RuntimeData:
+    """Objects stored in hass.data for each set up relay hub."""
+
+    hub: WaveshareRelayHub
+    coordinator: WaveshareRelayCoordinator
@@ -0,0 +1,70 @@
+"""Voluptuous schemas for the Waveshare Relay integration."""
+import voluptuous as vol
+
+from homeassistant.const import CONF_HOST, CONF_PORT
+import homeassistant.helpers.config_validation as cv
+
+from .const import (
+    DOMAIN,
+    CONF_NAME,
+    CONF_DEVICE_ADDRESS,
+    CONF_TIMEOUT,
+    CONF_LIGHTS,
+    CONF_SWITCHES,
+    CONF_ADDRESS,
+    CONF_RESTORE_STATE,
+    CONF_POLL_INTERVAL,
+    CONF_BATCH_MS,
+    DEFAULT_PORT,
+    DEFAULT_DEVICE_ADDRESS,
+    DEFAULT_TIMEOUT,
+    DEFAULT_RESTORE_STATE,
+    DEFAULT_POLL_INTERVAL,
+    DEFAULT_BATCH_MS,
+    VALID_NUM_RELAYS,
+)
+
+# Validators shared by the YAML and config flow schemas
+NUM_RELAYS_VALIDATOR = vol.In(VALID_NUM_RELAYS)
+RELAY_ADDR_VALIDATOR = vol.All(cv.positive_int, vol.Range(min=1, max=32))
+DEVICE_ADDR_VALIDATOR = vol.All(cv.positive_int, vol.Range(min=1, max=255))
+BATCH_MS_VALIDATOR = vol.All(vol.Coerce(int), vol.Range(min=0, max=1000))
+
+# Schema for a single light or switch on a relay module
+RELAY_ITEM_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_NAME): cv.string,
+        vol.Required(CONF_ADDRESS): RELAY_ADDR_VALIDATOR,
+    }
+)
+
+# YAML configuration schema for a single relay module
+RELAY_MODULE_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_HOST): cv.string,
+        vol.Required(CONF_NAME): cv.string,
+        vol.Optional(CONF_PORT, default=DEFAULT_PORT): cv.port,
+        vol.Optional(CONF_DEVICE_ADDRESS, default=DEFAULT_DEVICE_ADDRESS): DEVICE_ADDR_VALIDATOR,
+        vol.Optional(CONF_TIMEOUT, default=DEFAULT_TIMEOUT): cv.positive_int,
+        vol.Optional("num_relays", default=32): RELAY_ADDR_VALIDATOR,
+        vol.Optional(CONF_RESTORE_STATE, default=DEFAULT_RESTORE_STATE): cv.boolean,
+        vol.Optional(CONF_POLL_INTERVAL, default=DEFAULT_POLL_INTERVAL): cv.positive_int,
+        vol.Optional(CONF_BATCH_MS, default=DEFAULT_BATCH_MS): BATCH_MS_VALIDATOR,
+        vol.Optional(CONF_LIGHTS, default=[]): [RELAY_ITEM_SCHEMA],
+        vol.Optional(CONF_SWITCHES, default=[]): [RELAY_ITEM_SCHEMA],
+    }
+)
+
+# YAML configuration schema for the waveshare_relay section alone
+DOMAIN_CONFIG_SCHEMA = vol.All(
+    cv.ensure_list,
+    [RELAY_MODULE_SCHEMA]
+)
+
+# YAML configuration schema for the entire integration
+CONFIG_SCHEMA = vol.Schema(
+    {
+        DOMAIN: DOMAIN_CONFIG_SCHEMA
+    },
+    extra=vol.ALLOW_EXTRA  # Allow other configuration sections
+)
@@ -4,11 +4,14 @@ from typing import Any, Dict
 
 from homeassistant.components.switch import SwitchEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.discovery import async_load_platform
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from . import DOMAIN
+from .coordinator import WaveshareRelayCoordinator
+from .models import RuntimeData
 from .const import CONF_SWITCHES, CONF_NAME, CONF_ADDRESS
 
 _LOGGER = logging.getLogger(__name__)
@@ -26,23 +29,22 @@ async def async_setup_platform(
     _LOGGER.debug("Setting up Waveshare Relay switch platform from YAML")
     entry_id = discovery_info["entry_id"]
     config = discovery_info["config"]
-    hub = hass.data[DOMAIN][entry_id]
+    coordinator = hass.data[DOMAIN][entry_id].coordinator
     
     _LOGGER.debug("Relay config: %s", config)
     _LOGGER.debug("Relay name from config: %s", config.get(CONF_NAME))
     
     entities = []
+    # Use the relay name from the parent config
+    relay_name = config[CONF_NAME]
     
     # Add switches
     for switch_config in config.get(CONF_SWITCHES, []):
-        _LOGGER.debug("Adding switch entity: %s", switch_config[CONF_NAME])
-        # Use the relay name from the parent config
-        relay_name = config[CONF_NAME]
         unique_id = f"{relay_name}_{switch_config[CONF_NAME].lower().replace(' ', '_')}"
-        _LOGGER.debug("Generated unique_id: %s", unique_id)
+        _LOGGER.debug("Adding switch entity: %s (unique_id: %s)", switch_config[CONF_NAME], unique_id)
         entities.append(
             WaveshareRelaySwitch(
-                hub=hub,
+                coordinator=coordinator,
                 name=switch_config[CONF_NAME],
                 address=switch_config[CONF_ADDRESS],
                 unique_id=unique_id
@@ -50,7 +52,8 @@ async def async_setup_platform(
         )
     
     _LOGGER.debug("Adding %d switch entities", len(entities))
-    async_add_entities(entities, True)
+    # Entities start from the coordinator data, so no per-entity update first
+    async_add_entities(entities, False)
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -59,58 +62,56 @@ async def async_setup_entry(
 ) -> None:
     """Set up the Waveshare Relay switch entities from config entry."""
     _LOGGER.debug("Setting up Waveshare Relay switch platform from config entry")
-    entry_data = hass.data[DOMAIN][entry.entry_id]
-    hub = entry_data["hub"]
-    coordinator = entry_data["coordinator"]
+    entry_data: RuntimeData = hass.data[DOMAIN][entry.entry_id]
+    coordinator = entry_data.coordinator
     config = entry.data
     
     _LOGGER.debug("Config entry data: %s", config)
     _LOGGER.debug("Relay name from config entry: %s", config.get(CONF_NAME))
     
     entities = []
+    # Use the relay name from the parent config
+    relay_name = config[CONF_NAME]
     
     # Add switches
     for switch_config in config.get(CONF_SWITCHES, []):
-        _LOGGER.debug("Adding switch entity: %s", switch_config[CONF_NAME])
-        # Use the relay name from the parent config
-        relay_name = config[CONF_NAME]
         unique_id = f"{relay_name}_{switch_config[CONF_NAME].lower().replace(' ', '_')}"
-        _LOGGER.debug("Generated unique_id: %s", unique_id)
+        _LOGGER.debug("Adding switch entity: %s (unique_id: %s)", switch_config[CONF_NAME], unique_id)
         entities.append(
             WaveshareRelaySwitch(
-                hub=hub,
+                coordinator=coordinator,
                 name=switch_config[CONF_NAME],
                 address=switch_config[CONF_ADDRESS],
-                unique_id=unique_id,
-                coordinator=coordinator
+                unique_id=unique_id
             )
         )
     
     _LOGGER.debug("Adding %d switch entities", len(entities))
-    async_add_entities(entities, True)
+    # Entities start from the coordinator data, so no per-entity update first
+    async_add_entities(entities, False)
 
-class WaveshareRelaySwitch(SwitchEntity):
+class WaveshareRelaySwitch(CoordinatorEntity[WaveshareRelayCoordinator], SwitchEntity):
     """Representation of a Waveshare Relay Switch with improved reliability."""
-    
-    def __init__(self, hub, name, address, unique_id, coordinator=None):
+
+    # Defaults shared by all instances until a command sets them
+    _max_retries = 3
+    _last_command_success = True
+    _command_retries = 0
+
+    def __init__(self, coordinator, name, address, unique_id):
         """Initialize the switch."""
-        self._hub = hub
+        super().__init__(coordinator)
+        self._hub = coordinator.hub
         self._attr_name = name
         self._attr_unique_id = unique_id
         self._address = address
-        self._attr_is_on = False
-        self._coordinator = coordinator
-        self._last_command_success = True
-        self._command_retries = 0
-        self._max_retries = 3
+        self._attr_is_on = bool(coordinator.data) and coordinator.is_relay_on(address)
         _LOGGER.debug("Initialized switch entity: %s (address: %d)", name, address)
 
     @property
     def available(self) -> bool:
         """Return if the entity is available."""
-        if self._coordinator:
-            return self._coordinator.hub_available
-        return self._hub.is_available
+        return self.coordinator.hub_available
 
     @property
     def extra_state_attributes(self):
@@ -133,27 +134,35 @@ class WaveshareRelaySwitch(SwitchEntity):
         """Turn the switch on with retry logic."""
         _LOGGER.debug("Turning on switch: %s", self._attr_name)
         
+        # Show the new state right away; the write confirms or reverts it
+        previous_state = self._attr_is_on
+        self._attr_is_on = True
+        self.async_write_ha_state()
+        
         success = await self._execute_command(True)
         if success:
-            self._attr_is_on = True
             _LOGGER.debug("Switch turned on: %s", self._attr_name)
         else:
             _LOGGER.error("Failed to turn on switch after retries: %s", self._attr_name)
-            
-        self.async_write_ha_state()
+            self._attr_is_on = previous_state
+            self.async_write_ha_state()
 
     async def async_turn_off(self, **kwargs):
         """Turn the switch off with retry logic."""
         _LOGGER.debug("Turning off switch: %s", self._attr_name)
         
+        # Show the new state right away; the write confirms or reverts it
+        previous_state = self._attr_is_on
+        self._attr_is_on = False
+        self.async_write_ha_state()
+        
         success = await self._execute_command(False)
         if success:
-            self._attr_is_on = False
             _LOGGER.debug("Switch turned off: %s", self._attr_name)
         else:
             _LOGGER.error("Failed to turn off switch after retries: %s", self._attr_name)
-            
-        self.async_write_ha_state()
+            self._attr_is_on = previous_state
+            self.async_write_ha_state()
 
     async def _execute_command(self, target_state: bool) -> bool:
         """Execute command with retry logic."""
@@ -161,62 +170,33 @@ class WaveshareRelaySwitch(SwitchEntity):
         
         for attempt in range(self._max_retries):
             try:
-                success = await self._hub.set_relay_state(self._address, target_state)
+                success = await self.coordinator.async_set_relay_state(self._address, target_state)
                 if success:
                     self._last_command_success = True
                     self._command_retries = attempt
-                    
-                    # Verify state if possible
-                    if attempt == 0:  # Only verify on first attempt to avoid excessive polling
-                        await self._verify_state(target_state)
-                    
+                    # The device echoed the write, and the coordinator has
+                    # pushed the confirmed relay states to every entity
                     return True
                 else:
                     self._command_retries = attempt + 1
                     if attempt < self._max_retries - 1:
                         _LOGGER.warning(
-                            f"Command failed for {self._attr_name}, attempt {attempt + 1}/{self._max_retries}"
+                            "Command failed for %s, attempt %s/%s",
+                            self._attr_name,
+                            attempt + 1,
+                            self._max_retries,
                         )
                         
             except Exception as e:
                 self._command_retries = attempt + 1
-                _LOGGER.warning(f"Exception during command for {self._attr_name}: {e}")
+                _LOGGER.warning("Exception during command for %s: %s", self._attr_name, e)
                 
         self._last_command_success = False
         return False
 
-    async def _verify_state(self, expected_state: bool):
-        """Verify the actual state matches expected state."""
-        try:
-            actual_states = await self._hub.read_relay_status()
-            if actual_states and len(actual_states) >= self._address:
-                actual_state = actual_states[self._address - 1]
-                if actual_state != expected_state:
-                    _LOGGER.warning(
-                        f"State mismatch for {self._attr_name}: expected {expected_state}, got {actual_state}"
-                    )
-        except Exception as e:
-            _LOGGER.debug(f"Could not verify state for {self._attr_name}: {e}")
-
-    async def async_update(self):
-        """Update the switch state from coordinator or hub."""
-        _LOGGER.debug("Updating switch state: %s", self._attr_name)
-        
-        try:
-            if self._coordinator and self._coordinator.data:
-                # Use coordinator data if available
-                relay_states = self._coordinator.data.get("relay_states", [])
-                if len(relay_states) >= self._address:
-                    self._attr_is_on = relay_states[self._address - 1]
-                    _LOGGER.debug("Switch state updated from coordinator: %s (is_on: %s)", 
-                                self._attr_name, self._attr_is_on)
-                    return
-                    
-            # Fallback to direct hub polling
-            await self._hub.read_relay_status()
-            if len(self._hub._relay_states) >= self._address:
-                self._attr_is_on = self._hub._relay_states[self._address - 1]
-                _LOGGER.debug("Switch state updated from hub: %s (is_on: %s)", 
-                            self._attr_name, self._attr_is_on)
-        except Exception as e:
-            _LOGGER.warning(f"Failed to update state for {self._attr_name}: {e}") 
\ No newline at end of file
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Update the switch state from the coordinator's relay bitmap."""
+        if self.coordinator.data:
+            self._attr_is_on = self.coordinator.is_relay_on(self._address)
+        self.async_write_ha_state()
@@ -91,7 +91,7 @@ async def test_hub_improvements():
 
 async def test_circuit_breaker():
     """Test the circuit breaker functionality with mocked failures."""
-    from hub import ConnectionManager
+    from hub import CircuitBreakerState, ConnectionManager
     
     logger.info("Testing circuit breaker functionality...")
     
@@ -105,7 +105,7 @@ async def test_circuit_breaker():
     # Mock the _send_command_single method to simulate failures
     original_method = connection_manager._send_command_single
     
-    async def mock_failing_command(command):
+    async def mock_failing_command(command, expected_len=None):
         raise ConnectionError("Simulated network failure")
     
     connection_manager._send_command_single = mock_failing_command
@@ -117,7 +117,7 @@ async def test_circuit_breaker():
         if response is None:
             logger.info(f"Command failed as expected (failure count: {connection_manager._failure_count})")
         
-        if connection_manager._circuit_breaker_open:
+        if connection_manager._circuit_state is CircuitBreakerState.OPEN:
             logger.info("Circuit breaker opened!")
             break
     
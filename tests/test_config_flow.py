@@ -224,10 +224,33 @@ class TestValidateInput:
             "custom_components.waveshare_relay.config_flow.WaveshareRelayHub"
         ) as mock_hub:
             mock_hub.return_value.read_relay_status = AsyncMock(side_effect=Exception("Connection failed"))
+            mock_hub.return_value.close = AsyncMock()
             
             with pytest.raises(config_flow.CannotConnect):
                 await config_flow.validate_input(hass, data)
 
+            mock_hub.return_value.close.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_validate_input_no_response(self, hass):
+        """Test validation when the device does not answer the status query."""
+        data = {
+            CONF_HOST: "192.168.1.100",
+            CONF_NAME: "Test Hub",
+            CONF_PORT: DEFAULT_PORT,
+        }
+
+        with patch(
+            "custom_components.waveshare_relay.config_flow.WaveshareRelayHub"
+        ) as mock_hub:
+            mock_hub.return_value.read_relay_status = AsyncMock(return_value=None)
+            mock_hub.return_value.close = AsyncMock()
+            
+            with pytest.raises(config_flow.CannotConnect):
+                await config_flow.validate_input(hass, data)
+
+            mock_hub.return_value.close.assert_called_once()
+
 
 class MockConfigEntry:
     """Mock config entry."""
@@ -1,4 +1,5 @@
 """Tests for the Waveshare Relay Coordinator."""
+import random
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 from homeassistant.core import HomeAssistant
@@ -46,12 +47,12 @@ class TestWaveshareRelayCoordinator:
     @pytest.mark.asyncio
     async def test_async_update_data_success(self, coordinator, mock_hub):
         """Test successful data update."""
-        mock_hub._relay_states = [True, False, True, False] + [False] * 28
+        mock_hub.read_relay_status.return_value = [True, False, True, False] + [False] * 28
         
         result = await coordinator._async_update_data()
         
         mock_hub.read_relay_status.assert_called_once()
-        assert result == [True, False, True, False] + [False] * 28
+        assert result == bytes([0b00000101, 0x00, 0x00, 0x00])
 
     @pytest.mark.asyncio
     async def test_async_update_data_failure(self, coordinator, mock_hub):
@@ -127,16 +128,98 @@ class TestWaveshareRelayCoordinator:
         
         # Set up mock data
         test_data = [True, False, True, False] + [False] * 28
-        mock_hub._relay_states = test_data
+        mock_hub.read_relay_status.return_value = test_data
         
         # Get data multiple times
         result1 = await coordinator._async_update_data()
         result2 = await coordinator._async_update_data()
         
-        assert result1 == test_data
-        assert result2 == test_data
+        assert isinstance(result1, bytes)
+        assert result1 == bytes([0b00000101, 0x00, 0x00, 0x00])
         assert result1 == result2
 
+    @pytest.mark.asyncio
+    async def test_async_set_relay_state(self, coordinator, mock_hub):
+        """Test that relay writes go to the hub and publish the new bitmap."""
+        mock_hub.set_relay_state = AsyncMock(return_value=True)
+        mock_hub._relay_states[0] = True
+        
+        with patch.object(coordinator, 'async_set_updated_data') as mock_update:
+            result = await coordinator.async_set_relay_state(1, True)
+        
+        assert result is True
+        mock_hub.set_relay_state.assert_called_once_with(1, True)
+        mock_update.assert_called_once_with(bytes([0x01, 0x00, 0x00, 0x00]))
+
+    @pytest.mark.asyncio
+    async def test_async_set_relay_state_failure(self, coordinator, mock_hub):
+        """Test that a failed relay write does not publish new data."""
+        mock_hub.set_relay_state = AsyncMock(side_effect=ConnectionError("Network error"))
+        
+        with patch.object(coordinator, 'async_set_updated_data') as mock_update:
+            result = await coordinator.async_set_relay_state(1, True)
+        
+        assert result is False
+        mock_update.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_startup_offset_applies_once(self, coordinator):
+        """Test that the per-host poll offset only delays the first scheduled poll."""
+        coordinator._startup_offset = 7
+        
+        await coordinator._async_update_data()
+        assert coordinator.update_interval.total_seconds() == 37
+        
+        await coordinator._async_update_data()
+        assert coordinator.update_interval.total_seconds() == 30
+
+    def test_startup_offset_differs_per_device(self, mock_hass):
+        """Test that modules behind one gateway get their own poll offsets."""
+        offsets = set()
+        for address in (1, 2, 3):
+            hub = MagicMock()
+            hub._host = "192.168.1.100"
+            hub._port = 502
+            hub._device_address = address
+            coordinator = WaveshareRelayCoordinator(hass=mock_hass, hub=hub, poll_interval=30)
+            offsets.add(coordinator._startup_offset)
+        
+        assert len(offsets) == 3
+
+    def test_is_relay_on(self, coordinator):
+        """Test reading individual relays from the bitmap."""
+        coordinator.data = bytes([0b00000101, 0x00, 0x00, 0b10000000])
+        
+        assert coordinator.is_relay_on(1) is True
+        assert coordinator.is_relay_on(2) is False
+        assert coordinator.is_relay_on(3) is True
+        assert coordinator.is_relay_on(31) is False
+        assert coordinator.is_relay_on(32) is True
+
+    def test_handle_failure_backoff_jitter(self, coordinator):
+        """Test that the backoff poll interval is jittered around its base."""
+        with patch(
+            "waveshare_relay.coordinator.random.uniform", wraps=random.uniform
+        ) as mock_uniform:
+            for _ in range(3):
+                coordinator._handle_failure()
+        
+        # The jitter factor is drawn from 0.75-1.25
+        mock_uniform.assert_called_once_with(0.75, 1.25)
+        # First backoff step keeps the 30s base, jittered by up to 25%
+        assert 22.5 <= coordinator._current_poll_interval <= 37.5
+        # timedelta keeps microseconds only, so compare approximately
+        assert coordinator.update_interval.total_seconds() == pytest.approx(
+            coordinator._current_poll_interval, abs=1e-6
+        )
+        
+        with patch("waveshare_relay.coordinator.random.uniform", return_value=1.25):
+            for _ in range(10):
+                coordinator._handle_failure()
+        
+        # The 300s cap applies to the base before jitter
+        assert coordinator._current_poll_interval == 375
+
     @pytest.mark.asyncio
     async def test_coordinator_error_handling(self, mock_hass, mock_hub):
         """Test coordinator error handling."""
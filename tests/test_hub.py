@@ -1,17 +1,25 @@
 """Tests for the Waveshare Relay Hub."""
 import pytest
 import asyncio
+import socket
+import time
 from unittest.mock import AsyncMock, MagicMock, patch, mock_open
 import json
 from pathlib import Path
 
-from waveshare_relay.hub import WaveshareRelayHub
+from waveshare_relay.hub import WaveshareRelayHub, RetryConfig, CircuitBreakerState
 from waveshare_relay.const import CONF_LIGHTS, CONF_SWITCHES, CONF_RESTORE_STATE, CONF_NAME, CONF_ADDRESS
 
 
 class TestWaveshareRelayHub:
     """Test the WaveshareRelayHub class."""
 
+    @pytest.fixture(autouse=True)
+    def isolated_connections(self):
+        """Keep hubs from sharing connections across tests."""
+        with patch.dict('waveshare_relay.hub._GATEWAY_CONNECTIONS', clear=True):
+            yield
+
     @pytest.fixture
     def sample_config(self):
         """Create a sample configuration."""
@@ -37,6 +45,7 @@ class TestWaveshareRelayHub:
         """Create a mock Home Assistant instance."""
         hass = MagicMock()
         hass.config.config_dir = "/tmp"
+        hass.async_add_executor_job = AsyncMock(side_effect=lambda func, *args: func(*args))
         return hass
 
     @pytest.fixture
@@ -75,6 +84,41 @@ class TestWaveshareRelayHub:
         assert hub._restore_state is False
         assert hub._state_file is None
 
+    @pytest.mark.asyncio
+    async def test_hubs_share_gateway_connection(self, sample_config, mock_hass):
+        """Test that hubs on one gateway share a connection until the last closes."""
+        hub1 = WaveshareRelayHub(sample_config, mock_hass)
+        hub2 = WaveshareRelayHub({**sample_config, "device_address": 2}, mock_hass)
+        other = WaveshareRelayHub({**sample_config, "host": "192.168.1.101"}, mock_hass)
+        
+        connection = hub1._connection_manager._connection
+        assert hub2._connection_manager._connection is connection
+        assert other._connection_manager._connection is not connection
+        
+        with patch.object(connection, 'close', new_callable=AsyncMock) as mock_close:
+            await hub1.close()
+            mock_close.assert_not_called()
+            await hub2.close()
+            mock_close.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_shared_gateway_keeps_failures_per_hub(self, sample_config, mock_hass):
+        """Test that a failing module doesn't trip the breaker of its gateway neighbours."""
+        hub1 = WaveshareRelayHub(sample_config, mock_hass)
+        hub2 = WaveshareRelayHub({**sample_config, "device_address": 2, "timeout": 2}, mock_hass)
+        hub1._connection_manager.retry_config.max_attempts = 1
+        hub1._connection_manager.circuit_breaker_config.failure_threshold = 1
+        
+        with patch.object(
+            hub1._connection_manager, '_send_command_single', side_effect=ConnectionError("no reply")
+        ):
+            assert await hub1.send_command(b'\x01', 1) is None
+        
+        assert hub1.connection_stats["circuit_breaker_open"] is True
+        assert hub2.connection_stats["circuit_breaker_open"] is False
+        assert hub2.connection_stats["failure_count"] == 0
+        assert hub2._connection_manager.timeout == 2
+
     @pytest.mark.asyncio
     async def test_hub_create_factory_method(self, sample_config, mock_hass):
         """Test hub creation using factory method."""
@@ -108,7 +152,7 @@ class TestWaveshareRelayHub:
     async def test_set_relay_state_valid(self, hub):
         """Test setting a valid relay state."""
         with patch.object(hub, '_send_relay_states', new_callable=AsyncMock) as mock_send:
-            with patch.object(hub, '_save_last_states', new_callable=AsyncMock) as mock_save:
+            with patch.object(hub, '_schedule_save_last_states') as mock_save:
                 mock_send.return_value = True
                 
                 result = await hub.set_relay_state(1, True)
@@ -118,6 +162,65 @@ class TestWaveshareRelayHub:
                 mock_send.assert_called_once()
                 mock_save.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_set_relay_state_coalesces_writes(self, hub):
+        """Test that concurrent relay changes are sent in a single frame."""
+        with patch.object(hub, '_send_relay_states', new_callable=AsyncMock) as mock_send:
+            with patch.object(hub, '_schedule_save_last_states'):
+                mock_send.return_value = True
+                
+                results = await asyncio.gather(
+                    hub.set_relay_state(1, True),
+                    hub.set_relay_state(2, True),
+                    hub.set_relay_state(3, True),
+                )
+                
+                assert results == [True, True, True]
+                assert hub._relay_states[:3] == [True, True, True]
+                mock_send.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_set_relay_state_full_batch_sent_early(self, hub):
+        """Test that a full batch is sent without waiting out the window."""
+        hub._batch_delay = 10
+        with patch.object(hub, '_send_relay_states', new_callable=AsyncMock) as mock_send:
+            with patch.object(hub, '_schedule_save_last_states'):
+                mock_send.return_value = True
+                
+                results = await asyncio.wait_for(
+                    asyncio.gather(*(hub.set_relay_state(1, i % 2 == 0) for i in range(16))),
+                    timeout=1,
+                )
+                
+                assert all(results)
+                mock_send.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_set_relay_state_unchanged_skips_write(self, hub):
+        """Test that setting a relay to its confirmed state sends nothing."""
+        with patch.object(hub, 'send_command', new_callable=AsyncMock) as mock_send:
+            with patch.object(hub, '_schedule_save_last_states'):
+                mock_send.return_value = b'\x01\x0F\x00\x00\x00\x20\x54\x1b'
+                
+                assert await hub.set_relay_state(1, True) is True
+                assert await hub.set_relay_state(1, True) is True
+                assert await hub.set_relay_state(2, False) is True
+                
+                mock_send.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_set_relay_state_resends_after_failure(self, hub):
+        """Test that a state the device never confirmed is sent again."""
+        with patch.object(hub, 'send_command', new_callable=AsyncMock) as mock_send:
+            with patch.object(hub, '_schedule_save_last_states'):
+                mock_send.return_value = None
+                assert await hub.set_relay_state(1, True) is False
+                
+                mock_send.return_value = b'\x01\x0F\x00\x00\x00\x20\x54\x1b'
+                assert await hub.set_relay_state(1, True) is True
+                
+                assert mock_send.call_count == 2
+
     @pytest.mark.asyncio
     async def test_set_relay_state_invalid_number(self, hub):
         """Test setting relay state with invalid relay number."""
@@ -137,7 +240,7 @@ class TestWaveshareRelayHub:
     async def test_set_relay_state_send_failure(self, hub):
         """Test setting relay state when send fails."""
         with patch.object(hub, '_send_relay_states', new_callable=AsyncMock) as mock_send:
-            with patch.object(hub, '_save_last_states', new_callable=AsyncMock) as mock_save:
+            with patch.object(hub, '_schedule_save_last_states') as mock_save:
                 mock_send.return_value = None
                 
                 result = await hub.set_relay_state(1, True)
@@ -158,13 +261,37 @@ class TestWaveshareRelayHub:
             assert result is not None
             mock_send.assert_called_once()
 
+    @pytest.fixture
+    def mock_stream(self):
+        """Create a mock reader/writer pair for an open connection."""
+        mock_reader = AsyncMock()
+        mock_writer = MagicMock()
+        mock_writer.is_closing.return_value = False
+        mock_writer.drain = AsyncMock()
+        mock_writer.wait_closed = AsyncMock()
+        return mock_reader, mock_writer
+
     @pytest.mark.asyncio
-    async def test_send_command_success(self, hub):
+    async def test_send_relay_states_bit_pattern(self, hub):
+        """Test that relay states are packed in the order they are read back."""
+        with patch.object(hub, 'send_command', new_callable=AsyncMock) as mock_send:
+            with patch.object(hub, '_schedule_save_last_states'):
+                mock_send.return_value = b'\x01\x0F\x00\x00\x00\x20\x54\x1b'
+                
+                await hub.set_relay_state(1, True)
+                await hub.set_relay_state(3, True)
+                await hub.set_relay_state(1, False)
+                
+                command = mock_send.call_args[0][0]
+                assert command[7:11] == b'\x00\x00\x00\x04'
+                assert command[-2:] == hub.calculate_crc(command[:-2])
+
+    @pytest.mark.asyncio
+    async def test_send_command_success(self, hub, mock_stream):
         """Test successful command sending."""
         with patch('asyncio.open_connection', new_callable=AsyncMock) as mock_conn:
-            mock_reader = AsyncMock()
-            mock_writer = AsyncMock()
-            mock_conn.return_value = (mock_reader, mock_writer)
+            mock_reader, mock_writer = mock_stream
+            mock_conn.return_value = mock_stream
             
             command = b'\x01\x0F\x00\x00\x00\x20\x04\x00\x00\x00\x00\x00\x00'
             result = await hub.send_command(command)
@@ -172,7 +299,139 @@ class TestWaveshareRelayHub:
             assert result is not None
             mock_writer.write.assert_called_once_with(command)
             mock_writer.drain.assert_called_once()
+            # The connection stays open for the next command
+            mock_writer.close.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_connection_enables_keepalive(self, hub, mock_stream):
+        """Test that a new connection turns on TCP keepalive."""
+        with patch('asyncio.open_connection', new_callable=AsyncMock) as mock_conn:
+            mock_reader, mock_writer = mock_stream
+            mock_conn.return_value = mock_stream
+            
+            await hub.send_command(b'\x01\x01\x00\x00\x00\x20\x3d\xd2')
+            
+            sock = mock_writer.get_extra_info.return_value
+            sock.setsockopt.assert_any_call(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            if hasattr(socket, "TCP_KEEPIDLE"):
+                sock.setsockopt.assert_any_call(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30)
+
+    @pytest.mark.asyncio
+    async def test_availability_tracks_last_success(self, hub):
+        """Test that the hub is available only after a recent successful command."""
+        assert hub.is_available is False
+        assert hub.connection_stats["last_successful_communication"] == 0
+        
+        with patch.object(
+            hub._connection_manager, 'send_command_with_retry', new_callable=AsyncMock
+        ) as mock_send:
+            mock_send.return_value = b'\x01'
+            await hub.send_command(b'\x01')
+        
+        assert hub.is_available is True
+        assert hub.connection_stats["last_successful_communication"] > 0
+        
+        # Older than five minutes counts as unavailable
+        hub._last_successful_communication -= 301
+        assert hub.is_available is False
+
+    @pytest.mark.asyncio
+    async def test_send_command_reuses_connection(self, hub, mock_stream):
+        """Test that consecutive commands share one TCP connection."""
+        with patch('asyncio.open_connection', new_callable=AsyncMock) as mock_conn:
+            mock_reader, mock_writer = mock_stream
+            mock_conn.return_value = mock_stream
+            
+            command = b'\x01\x01\x00\x00\x00\x20\x3d\xd2'
+            await hub.send_command(command)
+            await hub.send_command(command)
+            
+            mock_conn.assert_called_once()
+            assert mock_writer.write.call_count == 2
+            
+            await hub.close()
+            mock_writer.close.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_idle_connection_closed(self, hub, mock_stream):
+        """Test that the connection is closed after a period without commands."""
+        hub._connection_manager._connection.idle_timeout = 0.01
+        with patch('asyncio.open_connection', new_callable=AsyncMock) as mock_conn:
+            mock_reader, mock_writer = mock_stream
+            mock_conn.return_value = mock_stream
+            
+            await hub.send_command(b'\x01\x01\x00\x00\x00\x20\x3d\xd2')
+            mock_writer.close.assert_not_called()
+            
+            await asyncio.sleep(0.05)
+            
+            mock_writer.close.assert_called_once()
+            assert hub._connection_manager._connection._writer is None
+
+    @pytest.mark.asyncio
+    async def test_send_command_drops_connection_on_error(self, hub, mock_stream):
+        """Test that a failed command closes the connection for a clean retry."""
+        hub._connection_manager.retry_config.max_attempts = 1
+        with patch('asyncio.open_connection', new_callable=AsyncMock) as mock_conn:
+            mock_reader, mock_writer = mock_stream
+            mock_reader.read.side_effect = ConnectionResetError()
+            mock_conn.return_value = mock_stream
+            
+            result = await hub.send_command(b'\x01\x01\x00\x00\x00\x20\x3d\xd2')
+            
+            assert result is None
             mock_writer.close.assert_called_once()
+            assert hub._connection_manager._connection._writer is None
+
+    @pytest.mark.asyncio
+    async def test_send_command_reads_exact_frame(self, hub, mock_stream):
+        """Test that a response is read by its expected length and CRC checked."""
+        frame = b'\x01\x01\x04\x05\x00\x00\x00'
+        frame += hub.calculate_crc(frame)
+        reader = asyncio.StreamReader()
+        # Bytes beyond the frame belong to the next response
+        reader.feed_data(frame + b'\xff')
+        mock_reader, mock_writer = mock_stream
+        
+        with patch('asyncio.open_connection', new_callable=AsyncMock) as mock_conn:
+            mock_conn.return_value = (reader, mock_writer)
+            
+            result = await hub.send_command(b'\x01\x01\x00\x00\x00\x20\x3d\xd2', len(frame))
+            
+            assert result == frame
+
+    @pytest.mark.asyncio
+    async def test_send_command_bad_crc(self, hub, mock_stream):
+        """Test that a response with a bad CRC is rejected."""
+        hub._connection_manager.retry_config.max_attempts = 1
+        reader = asyncio.StreamReader()
+        reader.feed_data(b'\x01\x0F\x00\x00\x00\x20\x00\x00')
+        mock_reader, mock_writer = mock_stream
+        
+        with patch('asyncio.open_connection', new_callable=AsyncMock) as mock_conn:
+            mock_conn.return_value = (reader, mock_writer)
+            
+            result = await hub.send_command(b'\x01\x0F', 8)
+            
+            assert result is None
+            mock_writer.close.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_send_command_exception_response(self, hub, mock_stream):
+        """Test that a Modbus exception response is treated as a failure."""
+        hub._connection_manager.retry_config.max_attempts = 1
+        frame = b'\x01\x81\x02'
+        frame += hub.calculate_crc(frame)
+        reader = asyncio.StreamReader()
+        reader.feed_data(frame)
+        mock_reader, mock_writer = mock_stream
+        
+        with patch('asyncio.open_connection', new_callable=AsyncMock) as mock_conn:
+            mock_conn.return_value = (reader, mock_writer)
+            
+            result = await hub.send_command(b'\x01\x01\x00\x00\x00\x20\x3d\xd2', 9)
+            
+            assert result is None
 
     @pytest.mark.asyncio
     async def test_send_command_timeout(self, hub):
@@ -185,6 +444,81 @@ class TestWaveshareRelayHub:
             
             assert result is None
 
+    @pytest.mark.asyncio
+    async def test_send_command_response_timeout(self, hub, mock_stream):
+        """Test that a device that stops answering is bounded by the timeout."""
+        hub._connection_manager.retry_config.max_attempts = 1
+        hub._connection_manager.timeout = 0.05
+        mock_reader, mock_writer = mock_stream
+        
+        with patch('asyncio.open_connection', new_callable=AsyncMock) as mock_conn:
+            # Nothing is ever fed to the reader
+            mock_conn.return_value = (asyncio.StreamReader(), mock_writer)
+            
+            result = await hub.send_command(b'\x01\x01\x00\x00\x00\x20\x3d\xd2', 9)
+            
+            assert result is None
+            mock_writer.close.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_send_command_retry_backoff(self, hub):
+        """Test that retries back off exponentially from a short base delay."""
+        with patch('asyncio.open_connection', new_callable=AsyncMock) as mock_conn:
+            mock_conn.side_effect = ConnectionRefusedError()
+            with patch('waveshare_relay.hub.asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
+                result = await hub.send_command(b'\x01\x01\x00\x00\x00\x20\x3d\xd2')
+            
+            assert result is None
+            # No sleep after the final attempt
+            delays = [call.args[0] for call in mock_sleep.call_args_list]
+            assert len(delays) == 2
+            assert 0.05 <= delays[0] <= 0.1
+            assert 0.1 <= delays[1] <= 0.15
+
+    def test_update_command_stats(self, hub):
+        """Test command counters and the running average response time."""
+        hub._update_command_stats(success=True, response_time=0.1)
+        hub._update_command_stats(success=False, response_time=0.3)
+        
+        stats = hub._command_stats
+        assert stats["total_commands"] == 2
+        assert stats["successful_commands"] == 1
+        assert stats["failed_commands"] == 1
+        assert stats["average_response_time"] == pytest.approx(0.2)
+
+    @pytest.mark.asyncio
+    async def test_circuit_breaker_half_open_probes(self, hub):
+        """Test that the breaker opens, lets limited probes through, then closes."""
+        manager = hub._connection_manager
+        manager.circuit_breaker_config.failure_threshold = 2
+        manager.circuit_breaker_config.half_open_max_calls = 1
+        
+        await manager._record_failure()
+        assert manager._circuit_state is CircuitBreakerState.CLOSED
+        await manager._record_failure()
+        assert manager._circuit_state is CircuitBreakerState.OPEN
+        assert await manager._is_circuit_breaker_open()
+        
+        # After the recovery timeout exactly one probe is allowed
+        manager._last_failure_time -= manager.circuit_breaker_config.recovery_timeout + 1
+        assert not await manager._is_circuit_breaker_open()
+        assert manager._circuit_state is CircuitBreakerState.HALF_OPEN
+        assert await manager._is_circuit_breaker_open()
+        
+        # A failed probe reopens it, a successful one closes it
+        await manager._record_failure()
+        assert manager._circuit_state is CircuitBreakerState.OPEN
+        manager._last_failure_time -= manager.circuit_breaker_config.recovery_timeout + 1
+        assert not await manager._is_circuit_breaker_open()
+        await manager._record_success()
+        assert manager._circuit_state is CircuitBreakerState.CLOSED
+        assert not await manager._is_circuit_breaker_open()
+
+    def test_retry_config_precomputes_delays(self):
+        """Test that the backoff schedule is built once and capped."""
+        config = RetryConfig(max_attempts=6, base_delay=0.1, max_delay=0.5)
+        assert config.delays == (0.1, 0.2, 0.4, 0.5, 0.5)
+
     @pytest.mark.asyncio
     async def test_send_command_connection_error(self, hub):
         """Test command sending with connection error."""
@@ -212,6 +546,124 @@ class TestWaveshareRelayHub:
             # Just check that the method works and returns the expected structure
             assert all(isinstance(state, bool) for state in result)
 
+    @pytest.mark.asyncio
+    async def test_read_relay_status_command(self, hub):
+        """Test that the status query is the precomputed read coils frame."""
+        with patch.object(hub, 'send_command', new_callable=AsyncMock) as mock_send:
+            mock_send.return_value = None
+            
+            await hub.read_relay_status()
+            
+            assert mock_send.call_args[0][0] == b'\x01\x01\x00\x00\x00\x20\x3d\xd2'
+
+    @pytest.mark.asyncio
+    async def test_read_relay_status_bit_order(self, hub):
+        """Test that relay 1 maps to the lowest bit of the last status byte."""
+        with patch.object(hub, 'send_command', new_callable=AsyncMock) as mock_send:
+            mock_send.return_value = b'\x01\x01\x04\x80\x00\x00\x05\x00\x00'
+            
+            result = await hub.read_relay_status()
+            
+            on = [i + 1 for i, state in enumerate(result) if state]
+            assert on == [1, 3, 32]
+
+    @pytest.mark.asyncio
+    async def test_read_relay_status_shares_inflight_read(self, hub):
+        """Test that concurrent status reads share one Modbus transaction."""
+        with patch.object(hub, 'send_command', new_callable=AsyncMock) as mock_send:
+            mock_send.return_value = b'\x01\x01\x04\x00\x00\x00\x01\x00\x00'
+            
+            first, second = await asyncio.gather(
+                hub.read_relay_status(),
+                hub.read_relay_status(),
+            )
+            
+            assert first == second
+            assert first[0] is True
+            mock_send.assert_called_once()
+            
+            # A call within the cache window reuses the result
+            await hub.read_relay_status()
+            mock_send.assert_called_once()
+            
+            # Once the result is stale a fresh read is made
+            hub._last_read -= hub._cache_ttl
+            await hub.read_relay_status()
+            assert mock_send.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_retried_write_does_not_overtake_newer_write(self, hub):
+        """Test that a write retrying after a failure can't land after a newer write."""
+        sent = []
+        
+        async def fake_single(command, expected_len=None):
+            sent.append(bytes(command))
+            if len(sent) == 1:
+                raise ConnectionError("dropped")
+            return command[:6] + b'\x00\x00'
+        
+        with patch.object(hub._connection_manager, '_send_command_single', side_effect=fake_single):
+            with patch.object(hub, '_schedule_save_last_states'):
+                turn_on = asyncio.create_task(hub.set_relay_state(1, True))
+                # Toggle back while the first write waits out its retry backoff
+                await asyncio.sleep(0.03)
+                turn_off = asyncio.create_task(hub.set_relay_state(1, False))
+                assert await turn_on is True
+                assert await turn_off is True
+        
+        # Failed ON, retried ON, then OFF last
+        assert [frame[10] & 1 for frame in sent] == [1, 1, 0]
+        assert hub._bit_pattern == 0
+        assert hub._confirmed_pattern == 0
+
+    @pytest.mark.asyncio
+    async def test_queued_write_sends_its_own_snapshot(self, hub):
+        """Test that a batch waiting on an earlier write sends the bitmap it closed with."""
+        sent = []
+        
+        async def fake_send(command, expected_len=None):
+            sent.append(bytes(command))
+            return command[:6] + b'\x00\x00'
+        
+        with patch.object(hub, 'send_command', side_effect=fake_send):
+            with patch.object(hub, '_schedule_save_last_states'):
+                async with hub._flush_lock:
+                    first = asyncio.create_task(hub.set_relay_state(1, True))
+                    await asyncio.sleep(0.03)
+                    second = asyncio.create_task(hub.set_relay_state(2, True))
+                    await asyncio.sleep(0.03)
+                assert await first is True
+                assert await second is True
+        
+        assert [frame[10] & 0x03 for frame in sent] == [0x01, 0x03]
+        assert hub._confirmed_pattern == 0x03
+
+    @pytest.mark.asyncio
+    async def test_read_during_batch_window_keeps_pending_change(self, hub):
+        """Test that a status read inside the batch window doesn't drop a queued toggle."""
+        sent = []
+        
+        async def fake_send(command, expected_len=None):
+            if command[1] == 0x01:
+                # The device still has every relay off
+                return b'\x01\x01\x04\x00\x00\x00\x00\x00\x00'
+            sent.append(bytes(command))
+            return command[:6] + b'\x00\x00'
+        
+        with patch.object(hub, 'send_command', side_effect=fake_send):
+            with patch.object(hub, '_schedule_save_last_states'):
+                toggle = asyncio.create_task(hub.set_relay_state(1, True))
+                await asyncio.sleep(0.005)
+                await hub.read_relay_status()
+                result = await toggle
+        
+        assert result is True
+        assert hub._relay_states[0] is True
+        # The write still carries relay 1 in the lowest bit of the last byte
+        assert len(sent) == 1
+        assert sent[0][7:11] == b'\x00\x00\x00\x01'
+        assert hub._confirmed_pattern == 1
+
     @pytest.mark.asyncio
     async def test_read_relay_status_invalid_response(self, hub):
         """Test relay status reading with invalid response."""
@@ -240,6 +692,13 @@ class TestWaveshareRelayHub:
         assert isinstance(crc, bytes)
         assert len(crc) == 2
 
+    def test_calculate_crc_known_value(self, hub):
+        """Test CRC calculation against a known Modbus frame."""
+        # Read coils 1-32 from device 1
+        data = b'\x01\x01\x00\x00\x00\x20'
+        
+        assert hub.calculate_crc(data) == b'\x3d\xd2'
+
     def test_calculate_crc_empty(self, hub):
         """Test CRC calculation with empty data."""
         data = b''
@@ -291,14 +750,80 @@ class TestWaveshareRelayHub:
         
         with patch('builtins.open', mock_open()) as mock_file:
             with patch.object(Path, 'mkdir') as mock_mkdir:
-                await hub._save_last_states()
+                with patch('os.replace') as mock_replace:
+                    await hub._save_last_states()
                 
                 mock_mkdir.assert_called_once()
                 mock_file.assert_called_once()
+                # Written to a temporary file, then moved over the state file
+                mock_replace.assert_called_once_with(
+                    hub._state_file.with_name(hub._state_file.name + ".tmp"), hub._state_file
+                )
                 
                 # Check that write was called with JSON data
                 write_calls = mock_file().write.call_args_list
                 assert len(write_calls) > 0
+                assert isinstance(json.loads(write_calls[0].args[0]), dict)
+
+    @pytest.mark.asyncio
+    async def test_state_save_debounced(self, hub):
+        """Test that a burst of relay changes is saved to disk once."""
+        with patch.object(hub, '_send_relay_states', new_callable=AsyncMock) as mock_send:
+            with patch.object(hub, '_save_last_states', new_callable=AsyncMock) as mock_save:
+                with patch('waveshare_relay.hub._STATE_SAVE_DELAY', 0.1):
+                    mock_send.return_value = True
+                    
+                    await hub.set_relay_state(1, True)
+                    await hub.set_relay_state(2, True)
+                    mock_save.assert_not_called()
+                    
+                    await asyncio.sleep(0.2)
+                    mock_save.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_close_flushes_pending_state_save(self, hub):
+        """Test that closing the hub writes a state save still being debounced."""
+        with patch.object(hub, '_send_relay_states', new_callable=AsyncMock) as mock_send:
+            with patch.object(hub, '_save_last_states', new_callable=AsyncMock) as mock_save:
+                mock_send.return_value = True
+                
+                await hub.set_relay_state(1, True)
+                await hub.close()
+                
+                mock_save.assert_called_once()
+                assert hub._save_handle is None
+
+    @pytest.mark.asyncio
+    async def test_close_fails_pending_write(self, hub):
+        """Test that unloading with a write still batching cancels it and fails its callers."""
+        with patch.object(hub, '_send_relay_states', new_callable=AsyncMock) as mock_send:
+            with patch.object(hub, '_schedule_save_last_states'):
+                toggle = asyncio.create_task(hub.set_relay_state(1, True))
+                await asyncio.sleep(0)
+                await hub.close()
+                
+                assert await toggle is False
+                mock_send.assert_not_called()
+                assert hub._pending_write is None
+                assert hub._flush_task is None
+
+    @pytest.mark.asyncio
+    async def test_close_fails_write_in_flight(self, hub):
+        """Test that unloading during a relay write cancels it and fails its callers."""
+        sending = asyncio.Event()
+        
+        async def slow_send(bit_pattern=None):
+            sending.set()
+            await asyncio.sleep(10)
+        
+        with patch.object(hub, '_send_relay_states', side_effect=slow_send):
+            with patch.object(hub, '_schedule_save_last_states'):
+                toggle = asyncio.create_task(hub.set_relay_state(1, True))
+                await sending.wait()
+                await hub.close()
+                
+                assert await toggle is False
+                assert hub._flush_task is None
 
     @pytest.mark.asyncio
     async def test_save_last_states_no_file(self, hub):
@@ -324,6 +849,27 @@ class TestWaveshareRelayHub:
                 mock_load.assert_called_once()
                 mock_send.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_restore_last_states_rereads_device(self, hub):
+        """Test that the next status read after a restore asks the device again."""
+        hub._last_read = time.monotonic()
+        
+        async def load():
+            hub._set_state(1, True)
+        
+        with patch.object(hub, '_load_last_states', side_effect=load):
+            with patch.object(hub, '_send_relay_states', new_callable=AsyncMock) as mock_send:
+                # The device didn't take the restored states
+                mock_send.return_value = None
+                await hub.restore_last_states()
+        
+        with patch.object(hub, 'send_command', new_callable=AsyncMock) as mock_cmd:
+            mock_cmd.return_value = b'\x01\x01\x04\x00\x00\x00\x00\x00\x00'
+            states = await hub.read_relay_status()
+        
+        mock_cmd.assert_called_once()
+        assert states[0] is False
+
     @pytest.mark.asyncio
     async def test_restore_last_states_disabled(self, hub):
         """Test restoring last states when disabled."""
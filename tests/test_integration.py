@@ -5,14 +5,24 @@ from homeassistant.core import HomeAssistant
 from homeassistant.config_entries import ConfigEntry, ConfigEntryState
 from homeassistant.const import CONF_HOST, CONF_PORT
 
-from waveshare_relay import DOMAIN, async_setup, async_setup_entry, async_unload_entry
+from waveshare_relay import (
+    DOMAIN,
+    _HUB_CACHE,
+    async_remove_entry,
+    async_setup,
+    async_setup_entry,
+    async_unload_entry,
+)
+from waveshare_relay.models import RuntimeData
 from waveshare_relay.const import (
+    DATA_PENDING_HUBS,
     CONF_NAME,
     CONF_DEVICE_ADDRESS,
     CONF_TIMEOUT,
     CONF_LIGHTS,
     CONF_SWITCHES,
     CONF_ADDRESS,
+    CONF_RESTORE_STATE,
     DEFAULT_PORT,
     DEFAULT_DEVICE_ADDRESS,
     DEFAULT_TIMEOUT,
@@ -141,7 +151,7 @@ class TestIntegration:
         result = await async_setup(mock_hass, config)
         
         assert result is True
-        assert DOMAIN not in mock_hass.data
+        assert mock_hass.data[DOMAIN] == {}
 
     @pytest.mark.asyncio
     async def test_async_setup_entry(self, mock_hass, config_entry_data):
@@ -149,6 +159,8 @@ class TestIntegration:
         mock_entry = MagicMock()
         mock_entry.entry_id = "test_entry_id"
         mock_entry.data = config_entry_data
+        # async_setup always runs before config entries are set up
+        mock_hass.data[DOMAIN] = {}
         
         with patch('waveshare_relay.WaveshareRelayHub.create', new_callable=AsyncMock) as mock_create:
             mock_hub = MagicMock()
@@ -164,13 +176,83 @@ class TestIntegration:
             assert result is True
             assert DOMAIN in mock_hass.data
             assert "test_entry_id" in mock_hass.data[DOMAIN]
-            assert mock_hass.data[DOMAIN]["test_entry_id"] == mock_hub
+            assert isinstance(mock_hass.data[DOMAIN]["test_entry_id"], RuntimeData)
+            assert mock_hass.data[DOMAIN]["test_entry_id"].hub == mock_hub
             
             # Check that platforms were forwarded
             mock_hass.config_entries.async_forward_entry_setups.assert_called_once_with(
                 mock_entry, ["light", "switch"]
             )
 
+    @pytest.mark.asyncio
+    async def test_async_setup_entry_closes_unused_probe_hub(self, mock_hass, config_entry_data):
+        """Test that a probe hub is closed when setup reuses a cached hub."""
+        mock_entry = MagicMock()
+        mock_entry.entry_id = "test_entry_id"
+        mock_entry.data = config_entry_data
+        mock_hass.data[DOMAIN] = {}
+        
+        hub_key = (config_entry_data[CONF_HOST], config_entry_data[CONF_PORT])
+        cached_hub = MagicMock()
+        cached_hub.restore_last_states = AsyncMock()
+        probe_hub = MagicMock()
+        probe_hub.close = AsyncMock()
+        mock_hass.data[DATA_PENDING_HUBS] = {hub_key: probe_hub}
+        
+        with patch.dict(_HUB_CACHE, {hub_key: cached_hub}, clear=True):
+            with patch(
+                'waveshare_relay.WaveshareRelayCoordinator.async_config_entry_first_refresh',
+                new_callable=AsyncMock,
+            ):
+                await async_setup_entry(mock_hass, mock_entry)
+        
+        assert mock_hass.data[DOMAIN]["test_entry_id"].hub is cached_hub
+        probe_hub.close.assert_called_once()
+        assert hub_key not in mock_hass.data[DATA_PENDING_HUBS]
+
+    @pytest.mark.asyncio
+    async def test_async_setup_entry_restores_before_first_refresh(self, mock_hass, config_entry_data):
+        """Test that the first refresh sees the states restored to the device."""
+        mock_entry = MagicMock()
+        mock_entry.entry_id = "test_entry_id"
+        mock_entry.data = {**config_entry_data, CONF_RESTORE_STATE: True}
+        mock_hass.data[DOMAIN] = {}
+        
+        calls = []
+        hub = MagicMock()
+        hub.restore_last_states = AsyncMock(side_effect=lambda: calls.append("restore"))
+        
+        with patch.dict(_HUB_CACHE, {}, clear=True):
+            with patch('waveshare_relay.WaveshareRelayHub.create', new_callable=AsyncMock) as mock_create:
+                mock_create.return_value = hub
+                with patch(
+                    'waveshare_relay.WaveshareRelayCoordinator.async_config_entry_first_refresh',
+                    new_callable=AsyncMock,
+                    side_effect=lambda: calls.append("refresh"),
+                ):
+                    await async_setup_entry(mock_hass, mock_entry)
+        
+        assert calls == ["restore", "refresh"]
+
+    @pytest.mark.asyncio
+    async def test_async_remove_entry_closes_cached_hub(self, mock_hass, config_entry_data):
+        """Test that removing an entry stuck in setup retry closes its hub."""
+        mock_entry = MagicMock()
+        mock_entry.entry_id = "test_entry_id"
+        mock_entry.data = config_entry_data
+        mock_hass.data[DOMAIN] = {"test_entry_id": MagicMock()}
+        
+        hub_key = (config_entry_data[CONF_HOST], config_entry_data[CONF_PORT])
+        cached_hub = MagicMock()
+        cached_hub.close = AsyncMock()
+        
+        with patch.dict(_HUB_CACHE, {hub_key: cached_hub}, clear=True):
+            await async_remove_entry(mock_hass, mock_entry)
+            assert hub_key not in _HUB_CACHE
+        
+        cached_hub.close.assert_called_once()
+        assert "test_entry_id" not in mock_hass.data[DOMAIN]
+
     @pytest.mark.asyncio
     async def test_async_unload_entry(self, mock_hass, config_entry_data):
         """Test config entry unload."""
@@ -268,16 +350,22 @@ class TestEndToEnd:
             # Create hub
             hub = await WaveshareRelayHub.create(config)
             
+            coordinator = MagicMock()
+            coordinator.hub = hub
+            coordinator.data = bytes(4)
+            coordinator.is_relay_on = MagicMock(return_value=False)
+            coordinator.async_set_relay_state = hub.set_relay_state
+            
             # Create entities
             light = WaveshareRelayLight(
-                hub=hub,
+                coordinator=coordinator,
                 name="Test Light",
                 address=1,
                 unique_id="test_light"
             )
             
             switch = WaveshareRelaySwitch(
-                hub=hub,
+                coordinator=coordinator,
                 name="Test Switch",
                 address=2,
                 unique_id="test_switch"
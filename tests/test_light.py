@@ -6,6 +6,8 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_HOST, CONF_PORT
 
 from waveshare_relay import DOMAIN
+from waveshare_relay.coordinator import WaveshareRelayCoordinator
+from waveshare_relay.models import RuntimeData
 from waveshare_relay.light import (
     async_setup_platform,
     async_setup_entry,
@@ -30,6 +32,19 @@ class TestWaveshareRelayLight:
         hub.read_relay_status = AsyncMock()
         return hub
 
+    @pytest.fixture
+    def mock_coordinator(self, mock_hub):
+        """Create a mock coordinator wrapping the hub."""
+        coordinator = MagicMock()
+        coordinator.hub = mock_hub
+        coordinator.data = bytes(4)
+        # Relay writes go through the coordinator straight to the hub
+        coordinator.async_set_relay_state = mock_hub.set_relay_state
+        coordinator.is_relay_on = lambda address: WaveshareRelayCoordinator.is_relay_on(
+            coordinator, address
+        )
+        return coordinator
+
     @pytest.fixture
     def light_config(self):
         """Create a light configuration."""
@@ -38,10 +53,10 @@ class TestWaveshareRelayLight:
             CONF_ADDRESS: 1,
         }
 
-    def test_light_initialization(self, mock_hub, light_config):
+    def test_light_initialization(self, mock_hub, mock_coordinator, light_config):
         """Test light initialization."""
         light = WaveshareRelayLight(
-            hub=mock_hub,
+            coordinator=mock_coordinator,
             name=light_config[CONF_NAME],
             address=light_config[CONF_ADDRESS],
             unique_id="test_light"
@@ -54,10 +69,10 @@ class TestWaveshareRelayLight:
         assert light._hub == mock_hub
 
     @pytest.mark.asyncio
-    async def test_light_turn_on_success(self, mock_hub, light_config):
+    async def test_light_turn_on_success(self, mock_hub, mock_coordinator, light_config):
         """Test successful light turn on."""
         light = WaveshareRelayLight(
-            hub=mock_hub,
+            coordinator=mock_coordinator,
             name=light_config[CONF_NAME],
             address=light_config[CONF_ADDRESS],
             unique_id="test_light"
@@ -71,12 +86,12 @@ class TestWaveshareRelayLight:
             mock_write.assert_called_once()
 
     @pytest.mark.asyncio
-    async def test_light_turn_on_failure(self, mock_hub, light_config):
+    async def test_light_turn_on_failure(self, mock_hub, mock_coordinator, light_config):
         """Test light turn on failure."""
         mock_hub.set_relay_state.return_value = False
         
         light = WaveshareRelayLight(
-            hub=mock_hub,
+            coordinator=mock_coordinator,
             name=light_config[CONF_NAME],
             address=light_config[CONF_ADDRESS],
             unique_id="test_light"
@@ -85,15 +100,16 @@ class TestWaveshareRelayLight:
         with patch.object(light, 'async_write_ha_state') as mock_write:
             await light.async_turn_on()
             
-            mock_hub.set_relay_state.assert_called_once_with(1, True)
-            assert light._attr_is_on is True  # State should still be updated
-            mock_write.assert_called_once()
+            mock_hub.set_relay_state.assert_called_with(1, True)
+            # The optimistic state is shown, then reverted after the retries fail
+            assert light._attr_is_on is False
+            assert mock_write.call_count == 2
 
     @pytest.mark.asyncio
-    async def test_light_turn_off_success(self, mock_hub, light_config):
+    async def test_light_turn_off_success(self, mock_hub, mock_coordinator, light_config):
         """Test successful light turn off."""
         light = WaveshareRelayLight(
-            hub=mock_hub,
+            coordinator=mock_coordinator,
             name=light_config[CONF_NAME],
             address=light_config[CONF_ADDRESS],
             unique_id="test_light"
@@ -108,44 +124,48 @@ class TestWaveshareRelayLight:
             mock_write.assert_called_once()
 
     @pytest.mark.asyncio
-    async def test_light_update(self, mock_hub, light_config):
-        """Test light state update."""
-        mock_hub._relay_states[0] = True  # Relay 1 is on
+    async def test_light_update(self, mock_hub, mock_coordinator, light_config):
+        """Test light state update from the coordinator."""
+        mock_coordinator.data = bytes([0x01, 0x00, 0x00, 0x00])  # Relay 1 is on
         
         light = WaveshareRelayLight(
-            hub=mock_hub,
+            coordinator=mock_coordinator,
             name=light_config[CONF_NAME],
             address=light_config[CONF_ADDRESS],
             unique_id="test_light"
         )
         
-        await light.async_update()
+        with patch.object(light, 'async_write_ha_state') as mock_write:
+            light._handle_coordinator_update()
+            mock_write.assert_called_once()
         
-        mock_hub.read_relay_status.assert_called_once()
+        mock_hub.read_relay_status.assert_not_called()
         assert light._attr_is_on is True
 
     @pytest.mark.asyncio
-    async def test_light_update_relay_off(self, mock_hub, light_config):
+    async def test_light_update_relay_off(self, mock_hub, mock_coordinator, light_config):
         """Test light state update when relay is off."""
-        mock_hub._relay_states[0] = False  # Relay 1 is off
+        mock_coordinator.data = bytes(4)  # Relay 1 is off
         
         light = WaveshareRelayLight(
-            hub=mock_hub,
+            coordinator=mock_coordinator,
             name=light_config[CONF_NAME],
             address=light_config[CONF_ADDRESS],
             unique_id="test_light"
         )
         light._attr_is_on = True  # Start with on state
         
-        await light.async_update()
+        with patch.object(light, 'async_write_ha_state') as mock_write:
+            light._handle_coordinator_update()
+            mock_write.assert_called_once()
         
-        mock_hub.read_relay_status.assert_called_once()
+        mock_hub.read_relay_status.assert_not_called()
         assert light._attr_is_on is False
 
-    def test_light_supported_features(self, mock_hub, light_config):
+    def test_light_supported_features(self, mock_hub, mock_coordinator, light_config):
         """Test light supported features."""
         light = WaveshareRelayLight(
-            hub=mock_hub,
+            coordinator=mock_coordinator,
             name=light_config[CONF_NAME],
             address=light_config[CONF_ADDRESS],
             unique_id="test_light"
@@ -184,8 +204,11 @@ class TestLightPlatform:
     @pytest.mark.asyncio
     async def test_async_setup_platform(self, mock_hass, mock_add_entities, platform_config):
         """Test platform setup from YAML."""
-        mock_hub = MagicMock()
-        mock_hass.data[DOMAIN]["test_entry_id"] = mock_hub
+        mock_coordinator = MagicMock()
+        mock_coordinator.data = bytes(4)
+        mock_hass.data[DOMAIN]["test_entry_id"] = RuntimeData(
+            hub=mock_coordinator.hub, coordinator=mock_coordinator
+        )
         
         discovery_info = {
             "entry_id": "test_entry_id",
@@ -225,8 +248,11 @@ class TestLightPlatform:
     @pytest.mark.asyncio
     async def test_async_setup_entry(self, mock_hass, mock_add_entities, platform_config):
         """Test platform setup from config entry."""
-        mock_hub = MagicMock()
-        mock_hass.data[DOMAIN]["test_entry_id"] = mock_hub
+        mock_coordinator = MagicMock()
+        mock_coordinator.data = bytes(4)
+        mock_hass.data[DOMAIN]["test_entry_id"] = RuntimeData(
+            hub=mock_coordinator.hub, coordinator=mock_coordinator
+        )
         
         mock_entry = MagicMock()
         mock_entry.entry_id = "test_entry_id"
@@ -240,14 +266,19 @@ class TestLightPlatform:
         
         # Check that entities were added
         mock_add_entities.assert_called_once()
+        # No update before add; entities start from the coordinator data
+        assert mock_add_entities.call_args[0][1] is False
         entities = mock_add_entities.call_args[0][0]
         assert len(entities) == 2
 
     @pytest.mark.asyncio
     async def test_async_setup_entry_no_lights(self, mock_hass, mock_add_entities):
         """Test platform setup with no lights configured."""
-        mock_hub = MagicMock()
-        mock_hass.data[DOMAIN]["test_entry_id"] = mock_hub
+        mock_coordinator = MagicMock()
+        mock_coordinator.data = bytes(4)
+        mock_hass.data[DOMAIN]["test_entry_id"] = RuntimeData(
+            hub=mock_coordinator.hub, coordinator=mock_coordinator
+        )
         
         mock_entry = MagicMock()
         mock_entry.entry_id = "test_entry_id"
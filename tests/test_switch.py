@@ -6,6 +6,8 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_HOST, CONF_PORT
 
 from waveshare_relay import DOMAIN
+from waveshare_relay.coordinator import WaveshareRelayCoordinator
+from waveshare_relay.models import RuntimeData
 from waveshare_relay.switch import (
     async_setup_platform,
     async_setup_entry,
@@ -30,6 +32,19 @@ class TestWaveshareRelaySwitch:
         hub.read_relay_status = AsyncMock()
         return hub
 
+    @pytest.fixture
+    def mock_coordinator(self, mock_hub):
+        """Create a mock coordinator wrapping the hub."""
+        coordinator = MagicMock()
+        coordinator.hub = mock_hub
+        coordinator.data = bytes(4)
+        # Relay writes go through the coordinator straight to the hub
+        coordinator.async_set_relay_state = mock_hub.set_relay_state
+        coordinator.is_relay_on = lambda address: WaveshareRelayCoordinator.is_relay_on(
+            coordinator, address
+        )
+        return coordinator
+
     @pytest.fixture
     def switch_config(self):
         """Create a switch configuration."""
@@ -38,10 +53,10 @@ class TestWaveshareRelaySwitch:
             CONF_ADDRESS: 1,
         }
 
-    def test_switch_initialization(self, mock_hub, switch_config):
+    def test_switch_initialization(self, mock_hub, mock_coordinator, switch_config):
         """Test switch initialization."""
         switch = WaveshareRelaySwitch(
-            hub=mock_hub,
+            coordinator=mock_coordinator,
             name=switch_config[CONF_NAME],
             address=switch_config[CONF_ADDRESS],
             unique_id="test_switch"
@@ -54,10 +69,10 @@ class TestWaveshareRelaySwitch:
         assert switch._hub == mock_hub
 
     @pytest.mark.asyncio
-    async def test_switch_turn_on_success(self, mock_hub, switch_config):
+    async def test_switch_turn_on_success(self, mock_hub, mock_coordinator, switch_config):
         """Test successful switch turn on."""
         switch = WaveshareRelaySwitch(
-            hub=mock_hub,
+            coordinator=mock_coordinator,
             name=switch_config[CONF_NAME],
             address=switch_config[CONF_ADDRESS],
             unique_id="test_switch"
@@ -71,12 +86,12 @@ class TestWaveshareRelaySwitch:
             mock_write.assert_called_once()
 
     @pytest.mark.asyncio
-    async def test_switch_turn_on_failure(self, mock_hub, switch_config):
+    async def test_switch_turn_on_failure(self, mock_hub, mock_coordinator, switch_config):
         """Test switch turn on failure."""
         mock_hub.set_relay_state.return_value = False
         
         switch = WaveshareRelaySwitch(
-            hub=mock_hub,
+            coordinator=mock_coordinator,
             name=switch_config[CONF_NAME],
             address=switch_config[CONF_ADDRESS],
             unique_id="test_switch"
@@ -85,15 +100,16 @@ class TestWaveshareRelaySwitch:
         with patch.object(switch, 'async_write_ha_state') as mock_write:
             await switch.async_turn_on()
             
-            mock_hub.set_relay_state.assert_called_once_with(1, True)
-            assert switch._attr_is_on is True  # State should still be updated
-            mock_write.assert_called_once()
+            mock_hub.set_relay_state.assert_called_with(1, True)
+            # The optimistic state is shown, then reverted after the retries fail
+            assert switch._attr_is_on is False
+            assert mock_write.call_count == 2
 
     @pytest.mark.asyncio
-    async def test_switch_turn_off_success(self, mock_hub, switch_config):
+    async def test_switch_turn_off_success(self, mock_hub, mock_coordinator, switch_config):
         """Test successful switch turn off."""
         switch = WaveshareRelaySwitch(
-            hub=mock_hub,
+            coordinator=mock_coordinator,
             name=switch_config[CONF_NAME],
             address=switch_config[CONF_ADDRESS],
             unique_id="test_switch"
@@ -108,38 +124,42 @@ class TestWaveshareRelaySwitch:
             mock_write.assert_called_once()
 
     @pytest.mark.asyncio
-    async def test_switch_update(self, mock_hub, switch_config):
-        """Test switch state update."""
-        mock_hub._relay_states[0] = True  # Relay 1 is on
+    async def test_switch_update(self, mock_hub, mock_coordinator, switch_config):
+        """Test switch state update from the coordinator."""
+        mock_coordinator.data = bytes([0x01, 0x00, 0x00, 0x00])  # Relay 1 is on
         
         switch = WaveshareRelaySwitch(
-            hub=mock_hub,
+            coordinator=mock_coordinator,
             name=switch_config[CONF_NAME],
             address=switch_config[CONF_ADDRESS],
             unique_id="test_switch"
         )
         
-        await switch.async_update()
+        with patch.object(switch, 'async_write_ha_state') as mock_write:
+            switch._handle_coordinator_update()
+            mock_write.assert_called_once()
         
-        mock_hub.read_relay_status.assert_called_once()
+        mock_hub.read_relay_status.assert_not_called()
         assert switch._attr_is_on is True
 
     @pytest.mark.asyncio
-    async def test_switch_update_relay_off(self, mock_hub, switch_config):
+    async def test_switch_update_relay_off(self, mock_hub, mock_coordinator, switch_config):
         """Test switch state update when relay is off."""
-        mock_hub._relay_states[0] = False  # Relay 1 is off
+        mock_coordinator.data = bytes(4)  # Relay 1 is off
         
         switch = WaveshareRelaySwitch(
-            hub=mock_hub,
+            coordinator=mock_coordinator,
             name=switch_config[CONF_NAME],
             address=switch_config[CONF_ADDRESS],
             unique_id="test_switch"
         )
         switch._attr_is_on = True  # Start with on state
         
-        await switch.async_update()
+        with patch.object(switch, 'async_write_ha_state') as mock_write:
+            switch._handle_coordinator_update()
+            mock_write.assert_called_once()
         
-        mock_hub.read_relay_status.assert_called_once()
+        mock_hub.read_relay_status.assert_not_called()
         assert switch._attr_is_on is False
 
 
@@ -172,8 +192,11 @@ class TestSwitchPlatform:
     @pytest.mark.asyncio
     async def test_async_setup_platform(self, mock_hass, mock_add_entities, platform_config):
         """Test platform setup from YAML."""
-        mock_hub = MagicMock()
-        mock_hass.data[DOMAIN]["test_entry_id"] = mock_hub
+        mock_coordinator = MagicMock()
+        mock_coordinator.data = bytes(4)
+        mock_hass.data[DOMAIN]["test_entry_id"] = RuntimeData(
+            hub=mock_coordinator.hub, coordinator=mock_coordinator
+        )
         
         discovery_info = {
             "entry_id": "test_entry_id",
@@ -213,8 +236,11 @@ class TestSwitchPlatform:
     @pytest.mark.asyncio
     async def test_async_setup_entry(self, mock_hass, mock_add_entities, platform_config):
         """Test platform setup from config entry."""
-        mock_hub = MagicMock()
-        mock_hass.data[DOMAIN]["test_entry_id"] = mock_hub
+        mock_coordinator = MagicMock()
+        mock_coordinator.data = bytes(4)
+        mock_hass.data[DOMAIN]["test_entry_id"] = RuntimeData(
+            hub=mock_coordinator.hub, coordinator=mock_coordinator
+        )
         
         mock_entry = MagicMock()
         mock_entry.entry_id = "test_entry_id"
@@ -228,14 +254,19 @@ class TestSwitchPlatform:
         
         # Check that entities were added
         mock_add_entities.assert_called_once()
+        # No update before add; entities start from the coordinator data
+        assert mock_add_entities.call_args[0][1] is False
         entities = mock_add_entities.call_args[0][0]
         assert len(entities) == 2
 
     @pytest.mark.asyncio
     async def test_async_setup_entry_no_switches(self, mock_hass, mock_add_entities):
         """Test platform setup with no switches configured."""
-        mock_hub = MagicMock()
-        mock_hass.data[DOMAIN]["test_entry_id"] = mock_hub
+        mock_coordinator = MagicMock()
+        mock_coordinator.data = bytes(4)
+        mock_hass.data[DOMAIN]["test_entry_id"] = RuntimeData(
+            hub=mock_coordinator.hub, coordinator=mock_coordinator
+        )
         
         mock_entry = MagicMock()
         mock_entry.entry_id = "test_entry_id"